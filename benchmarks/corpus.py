@@ -0,0 +1,220 @@
+"""
+Deterministic synthetic PDF corpus for the benchmarks.
+
+    python benchmarks/corpus.py OUT_DIR [--seed 0] [--scale 1]
+
+Generates, with PyMuPDF only:
+
+    text             one-page born-digital statements (~40 lines)
+    text-multipage   five-page born-digital documents
+    text-heading     one-page documents whose "INVOICE"-style heading is set
+                     larger and bolder than the company line above it
+    text-bold-label  one-page documents with the company in plain body text
+                     and a bold body-size label ("Customer Details") below
+    scan-<dpi>dpi    image-only pages rasterized at 100, 150, 200 and 300 DPI
+    scan-multipage   three-page image-only documents
+    blank            a page with no text and no images
+    malformed        truncated, garbage and empty files
+
+The same seed and scale always give byte-identical files, so timings from
+different runs (and machines) are measured on the same input. A
+corpus.json manifest maps each file to its category, and each document to
+the company it was generated for (see expected_companies).
+"""
+
+import argparse
+import json
+import os
+import random
+
+# Bump when the generated files change, so stale corpora are regenerated.
+CORPUS_VERSION = 3
+
+SCAN_DPIS = (100, 150, 200, 300)
+
+_COMPANY_WORDS = ("Acme", "Globex", "Initech", "Umbrella", "Hooli", "Vandelay", "Stark", "Wayne", "Tyrell", "Cyberdyne")
+_COMPANY_SUFFIXES = ("Ltd", "GmbH", "Inc.", "LLC", "Holdings", "Industries")
+_DOC_TYPES = ("Invoice", "Statement", "Credit Note", "Purchase Order", "Delivery Note", "Quotation")
+_LABELS = ("Customer Details", "Billing Address", "Payment Terms", "Account Summary", "Delivery Address")
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December")
+
+
+def _lines(rng, count: int):
+    """Header lines of a business document, company first, then table-like filler."""
+    company = f"{rng.choice(_COMPANY_WORDS)} {rng.choice(_COMPANY_WORDS)} {rng.choice(_COMPANY_SUFFIXES)}"
+    lines = [
+        company,
+        f"{rng.choice(_DOC_TYPES)} {rng.choice(_MONTHS)} {rng.randint(2015, 2025)}",
+        f"{rng.randint(1, 999)} Main Street, {rng.randint(10000, 99999)} Springfield",
+        f"Reference {rng.randint(100000, 999999)}",
+    ]
+    while len(lines) < count:
+        lines.append(
+            f"{rng.randint(1, 31):02d}.{rng.randint(1, 12):02d}.  Item {rng.randint(1000, 9999)}  "
+            f"{rng.choice(_DOC_TYPES)}  {rng.randint(1, 9999)}.{rng.randint(0, 99):02d}"
+        )
+    return lines
+
+
+def _text_page(doc, lines, heading=None, label=None):
+    """
+    A page with lines[0], the company, set large and bold. With `heading`,
+    the company is body text and the heading below it is the largest line;
+    with `label`, the company is body text followed by a bold body-size label.
+    """
+    page = doc.new_page()  # A4 by default
+    y = 60
+    for i, line in enumerate(lines):
+        big = i == 0 and heading is None and label is None
+        page.insert_text((50, y), line, fontsize=16 if big else 10, fontname="hebo" if big else "helv")
+        y += 22 if big else 16
+        if i == 0 and heading is not None:
+            y += 12
+            page.insert_text((50, y), heading, fontsize=20, fontname="hebo")
+            y += 26
+        if i == 0 and label is not None:
+            page.insert_text((50, y), label, fontsize=10, fontname="hebo")
+            y += 16
+        if y > page.rect.height - 40:
+            break
+    return page
+
+
+def _save(doc, path):
+    # No new /ID and no dates, so the same input gives the same bytes.
+    doc.set_metadata({})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def _text_pdf(path, rng, pages: int, heading: bool = False, label: bool = False):
+    """Return the company on page 1."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    companies = []
+    for _ in range(pages):
+        lines = _lines(rng, 40)
+        companies.append(lines[0])
+        _text_page(
+            doc,
+            lines,
+            heading=rng.choice(_DOC_TYPES).upper() if heading else None,
+            label=rng.choice(_LABELS) if label else None,
+        )
+    _save(doc, path)
+    return companies[0]
+
+
+def _scan_pdf(path, rng, pages: int, dpi: int):
+    """
+    Image-only PDF: each text page is rasterized and placed as a picture.
+    Return the company on page 1.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    companies = []
+    for _ in range(pages):
+        src = fitz.open()
+        lines = _lines(rng, 40)
+        companies.append(lines[0])
+        pix = _text_page(src, lines).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        page = doc.new_page(width=src[0].rect.width, height=src[0].rect.height)
+        page.insert_image(page.rect, pixmap=pix)
+        src.close()
+    _save(doc, path)
+    return companies[0]
+
+
+def generate(out_dir: str, seed: int = 0, scale: int = 1):
+    """Write the corpus to out_dir and return its manifest {file name: category}."""
+    import fitz  # PyMuPDF
+
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = {}
+    companies = {}
+
+    def add(category, name):
+        manifest[name] = category
+        return os.path.join(out_dir, name)
+
+    for i in range(20 * scale):
+        name = f"text-{i:03d}.pdf"
+        companies[name] = _text_pdf(add("text", name), rng, pages=1)
+    for i in range(5 * scale):
+        name = f"text-multipage-{i:03d}.pdf"
+        companies[name] = _text_pdf(add("text-multipage", name), rng, pages=5)
+    for i in range(5 * scale):
+        name = f"text-heading-{i:03d}.pdf"
+        companies[name] = _text_pdf(add("text-heading", name), rng, pages=1, heading=True)
+    for i in range(5 * scale):
+        name = f"text-bold-label-{i:03d}.pdf"
+        companies[name] = _text_pdf(add("text-bold-label", name), rng, pages=1, label=True)
+    for dpi in SCAN_DPIS:
+        for i in range(3 * scale):
+            name = f"scan-{dpi}dpi-{i:03d}.pdf"
+            companies[name] = _scan_pdf(add(f"scan-{dpi}dpi", name), rng, pages=1, dpi=dpi)
+    for i in range(2 * scale):
+        name = f"scan-multipage-{i:03d}.pdf"
+        companies[name] = _scan_pdf(add("scan-multipage", name), rng, pages=3, dpi=200)
+    for i in range(2 * scale):
+        doc = fitz.open()
+        doc.new_page()
+        _save(doc, add("blank", f"blank-{i:03d}.pdf"))
+
+    # Malformed: a truncated document, random bytes and an empty file.
+    with open(os.path.join(out_dir, "text-000.pdf"), "rb") as f:
+        good = f.read()
+    with open(add("malformed", "malformed-truncated.pdf"), "wb") as f:
+        f.write(good[: len(good) // 2])
+    with open(add("malformed", "malformed-garbage.pdf"), "wb") as f:
+        f.write(bytes(rng.randrange(256) for _ in range(4096)))
+    open(add("malformed", "malformed-empty.pdf"), "wb").close()
+
+    with open(os.path.join(out_dir, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": CORPUS_VERSION, "seed": seed, "scale": scale, "files": manifest, "companies": companies},
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+    return manifest
+
+
+def load_or_generate(out_dir: str, seed: int = 0, scale: int = 1):
+    """Reuse the corpus in out_dir if it was generated with the same settings."""
+    try:
+        with open(os.path.join(out_dir, "corpus.json"), encoding="utf-8") as f:
+            info = json.load(f)
+        if (info["version"], info["seed"], info["scale"]) == (CORPUS_VERSION, seed, scale):
+            return info["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return generate(out_dir, seed, scale)
+
+
+def expected_companies(out_dir: str):
+    """{file name: the company its page 1 was generated for} in out_dir."""
+    with open(os.path.join(out_dir, "corpus.json"), encoding="utf-8") as f:
+        return json.load(f).get("companies", {})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=int, default=1, help="multiply the number of files per category")
+    args = parser.parse_args(argv)
+
+    manifest = generate(args.out_dir, args.seed, args.scale)
+    counts = {}
+    for category in manifest.values():
+        counts[category] = counts.get(category, 0) + 1
+    for category, count in sorted(counts.items()):
+        print(f"{category:>16}: {count}")
+
+
+if __name__ == "__main__":
+    main()
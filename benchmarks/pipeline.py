@@ -0,0 +1,281 @@
+"""
+Pipeline benchmark: throughput and memory of each naming stage.
+
+    python benchmarks/pipeline.py [--repeat 5] [--min-time 1] [--json]
+    python benchmarks/pipeline.py --save-baseline benchmarks/baseline.json
+    python benchmarks/pipeline.py --baseline benchmarks/baseline.json [--tolerance 0.2]
+
+Runs extract_text_from_pdf, ocr_first_pages and propose_new_name (OCR in
+process, no cache) over the synthetic corpus from corpus.py, per category
+of file. Each category is timed for at least --repeat passes and
+--min-time seconds, and its files/sec is that of the median pass. Every
+stage runs in a fresh interpreter, so its peak RSS is its own and nothing
+is warm from another stage. Alongside files/sec it reports
+the mean of each sub-stage (open, get_text, rasterize, tesseract, ...) from
+src.metrics, and for propose_new_name the share of names that start with
+the company each document was generated for.
+
+With --baseline, files/sec and peak RSS are compared to a stored run and
+the exit status is 1 if anything regressed by more than --tolerance. A
+category's files/sec only counts once both runs timed it over at least
+MIN_COMPARE_REPEAT passes and MIN_COMPARE_SECONDS in all; shorter runs
+are listed but never flagged. Baselines are machine specific: save
+one on the machine you compare on. Without Tesseract the OCR stage is
+skipped, and so are the categories propose_new_name would OCR.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import CORPUS_VERSION, expected_companies, load_or_generate  # noqa: E402
+
+SCAN_CATEGORIES = ("scan-100dpi", "scan-150dpi", "scan-200dpi", "scan-300dpi", "scan-multipage")
+# Categories propose_new_name OCRs: timed without Tesseract, they would
+# only measure a failing process launch.
+OCR_CATEGORIES = SCAN_CATEGORIES + ("blank",)
+
+# Stage name -> (function in src.renamer, categories it runs on).
+STAGES = {
+    "extract_text": ("extract_text_from_pdf", None),
+    "ocr": ("ocr_first_pages", SCAN_CATEGORIES),
+    "propose": ("propose_new_name", None),
+}
+
+# A few passes over a handful of fast files are noise: below this many
+# passes, or this much timed work per category, nothing is flagged.
+MIN_COMPARE_REPEAT = 3
+MIN_COMPARE_SECONDS = 1.0
+# Upper bound on passes per category, however fast its files are.
+MAX_PASSES = 100_000
+
+CHILD = r"""
+import json, statistics, sys, time
+from src import renamer
+from src.metrics import METRICS
+
+fn = getattr(renamer, sys.argv[1])
+files = json.loads(sys.argv[2])  # [[path, category, expected company or None], ...]
+repeat, min_time, max_passes = int(sys.argv[3]), float(sys.argv[4]), int(sys.argv[5])
+
+fn(files[0][0])  # warm up: imports, fonts, OCR engine
+METRICS.reset()
+
+by_category = {}
+for path, category, company in files:
+    by_category.setdefault(category, []).append((path, company))
+
+# Passes over a category continue until there are enough of them and they
+# add up to min_time; the median pass counts, so a slow outlier or a lucky
+# fast pass moves nothing.
+results = {}
+for category, entries in by_category.items():
+    passes = []
+    named = set()  # names starting with the expected company
+    while len(passes) < repeat or (sum(passes) < min_time and len(passes) < max_passes):
+        seconds = 0.0
+        for path, company in entries:
+            t0 = time.perf_counter()
+            out = fn(path)
+            seconds += time.perf_counter() - t0
+            if company and out.startswith(company):
+                named.add(path)
+        passes.append(seconds)
+    median = statistics.median(passes)
+    named_share = any(c for _, c in entries) and sys.argv[1] == "propose_new_name"
+    results[category] = {
+        "files": len(entries),
+        "passes": len(passes),
+        "timed_s": sum(passes),
+        "seconds": median,
+        "files_per_s": len(entries) / median if median else None,
+        "company_ok": len(named) / len(entries) if named_share else None,
+    }
+
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    peak_rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+except ImportError:  # Windows
+    peak_rss_mb = None
+
+print(json.dumps({
+    "categories": results,
+    "substages_mean_s": {s: h["mean_s"] for s, h in METRICS.snapshot().items()},
+    "peak_rss_mb": peak_rss_mb,
+}))
+"""
+
+
+def _ocr_available() -> bool:
+    if importlib.util.find_spec("tesserocr") is not None:
+        return True
+    try:
+        import pytesseract
+    except ImportError:
+        return False
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+
+def run_stage(stage: str, corpus_dir: str, manifest, repeat: int, min_time: float, skip=()):
+    func, categories = STAGES[stage]
+    companies = expected_companies(corpus_dir)
+    files = [
+        [os.path.join(corpus_dir, name), category, companies.get(name)]
+        for name, category in sorted(manifest.items())
+        if (categories is None or category in categories) and category not in skip
+    ]
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, func, json.dumps(files), str(repeat), str(min_time), str(MAX_PASSES)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def environment(ocr: bool):
+    from importlib.metadata import version
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pymupdf": version("PyMuPDF"),
+        "corpus_version": CORPUS_VERSION,
+        "ocr": ocr,
+    }
+
+
+def compare(current, baseline, tolerance: float):
+    """
+    Return (rows, regressed): one row per stage/category/metric present in
+    both runs. Rows whose samples are too small to judge (see
+    MIN_COMPARE_SECONDS) have None for "regressed".
+    """
+    rows = []
+    regressed = False
+    for stage, result in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            continue
+        for category, values in result["categories"].items():
+            old_values = base["categories"].get(category, {})
+            old, new = old_values.get("files_per_s"), values["files_per_s"]
+            if old and new:
+                change = new / old - 1
+                passes = min(values.get("passes", 0), old_values.get("passes", 0))
+                timed_s = min(values.get("timed_s", 0.0), old_values.get("timed_s", 0.0))
+                if passes >= MIN_COMPARE_REPEAT and timed_s >= MIN_COMPARE_SECONDS:
+                    bad = change < -tolerance
+                    regressed |= bad
+                else:
+                    bad = None
+                rows.append((stage, category, "files/s", old, new, change, bad))
+        old, new = base.get("peak_rss_mb"), result.get("peak_rss_mb")
+        if old and new:
+            change = new / old - 1
+            bad = change > tolerance
+            regressed |= bad
+            rows.append((stage, "-", "peak RSS MB", old, new, change, bad))
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=None, help="corpus folder (default: a cached one in the temp folder)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=int, default=1, help="multiply the number of files per category")
+    parser.add_argument("--repeat", type=int, default=5, help="minimum passes over each category; the median one counts")
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=MIN_COMPARE_SECONDS,
+        help=f"minimum seconds timed per category (default: {MIN_COMPARE_SECONDS:g}; less is never judged)",
+    )
+    parser.add_argument("--stage", action="append", choices=sorted(STAGES), help="only run these stages")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--baseline", default=None, help="compare against this stored run")
+    parser.add_argument("--save-baseline", default=None, metavar="FILE", help="store this run as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    corpus_dir = args.corpus or os.path.join(
+        tempfile.gettempdir(), f"pdf-renamer-bench-v{CORPUS_VERSION}-{args.seed}-{args.scale}"
+    )
+    manifest = load_or_generate(corpus_dir, args.seed, args.scale)
+
+    ocr = _ocr_available()
+    current = {
+        "environment": environment(ocr),
+        "repeat": args.repeat,
+        "min_time": args.min_time,
+        "stages": {},
+        "skipped": {},
+    }
+    for stage in args.stage or list(STAGES):
+        if stage == "ocr" and not ocr:
+            current["skipped"][stage] = "Tesseract not found"
+            continue
+        skip = OCR_CATEGORIES if stage == "propose" and not ocr else ()
+        if skip:
+            current["skipped"][stage] = f"{', '.join(skip)}: Tesseract not found"
+        current["stages"][stage] = run_stage(stage, corpus_dir, manifest, args.repeat, args.min_time, skip)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    rows, regressed = [], False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressed = compare(current, baseline, args.tolerance)
+        if baseline.get("environment") != current["environment"]:
+            print("note: baseline was recorded in a different environment", file=sys.stderr)
+        if any(bad is None for *_, bad in rows):
+            print(
+                f"note: files/s is only judged over {MIN_COMPARE_REPEAT}+ passes and {MIN_COMPARE_SECONDS:g}+ s"
+                " per category (in both runs)",
+                file=sys.stderr,
+            )
+
+    if args.json:
+        current["comparison"] = [
+            dict(zip(("stage", "category", "metric", "baseline", "current", "change", "regressed"), row)) for row in rows
+        ]
+        print(json.dumps(current, indent=2))
+    else:
+        for stage, result in current["stages"].items():
+            rss = result["peak_rss_mb"]
+            print(f"{stage}  (peak RSS {rss:.0f} MB)" if rss else stage)
+            for category, values in sorted(result["categories"].items()):
+                ok = values.get("company_ok")
+                named = f"  company named {ok:.0%}" if ok is not None else ""
+                print(f"  {category:>16}: {values['files_per_s']:8.1f} files/s{named}")
+            for substage, mean_s in sorted(result["substages_mean_s"].items()):
+                print(f"  {substage:>16}: {mean_s * 1000:8.2f} ms mean")
+        for stage, reason in current["skipped"].items():
+            print(f"{stage}: skipped ({reason})")
+        if rows:
+            print("vs. baseline")
+            for stage, category, metric, old, new, change, bad in rows:
+                flag = "  REGRESSED" if bad else ("  (too few samples)" if bad is None else "")
+                print(f"  {stage:>12} {category:>16} {metric:>12}: {old:8.1f} -> {new:8.1f} ({change:+.0%}){flag}")
+
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
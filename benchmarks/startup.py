@@ -0,0 +1,91 @@
+"""
+Startup-time benchmark: how long until the GUI window is on screen.
+
+    python benchmarks/startup.py [--runs 5] [--json]
+
+Every run starts a fresh interpreter, which imports src.pdf_renamer_gui,
+creates App and waits until the window has been drawn. It reports the time
+to import the GUI module, the time to the first drawn window, and the
+total wall time including interpreter start-up. It also lists which heavy
+dependencies were already imported when the window appeared; they should
+only be loaded later, in the background.
+
+Without a display only the import time is measured.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("fitz", "pymupdf", "PIL", "pytesseract", "tesserocr")
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from src.pdf_renamer_gui import App
+t_import = time.perf_counter() - t0
+result = {"import_s": t_import, "window_s": None}
+heavy = %r
+try:
+    app = App()
+    app.update()
+    result["window_s"] = time.perf_counter() - t0
+    result["heavy_loaded"] = [m for m in heavy if m in sys.modules]
+    app.on_close()
+except Exception as e:  # typically no display
+    result["error"] = str(e).splitlines()[0]
+print(json.dumps(result))
+""" % (HEAVY_MODULES,)
+
+
+def run_once():
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["total_s"] = time.perf_counter() - start
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.runs)]
+
+    summary = {"runs": args.runs}
+    for key in ("import_s", "window_s", "total_s"):
+        values = [r[key] for r in runs if r.get(key) is not None]
+        summary[key] = statistics.median(values) if values else None
+    summary["heavy_loaded"] = sorted({m for r in runs for m in r.get("heavy_loaded", [])})
+    errors = {r["error"] for r in runs if "error" in r}
+    if errors:
+        summary["error"] = sorted(errors)[0]
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    for key, label in (("import_s", "import GUI module"), ("window_s", "first window"), ("total_s", "total incl. interpreter")):
+        value = summary[key]
+        print(f"{label:>24}: " + (f"{value * 1000:8.1f} ms" if value is not None else "     n/a"))
+    print(f"{'heavy modules at window':>24}: {', '.join(summary['heavy_loaded']) or 'none'}")
+    if "error" in summary:
+        print(f"{'note':>24}: {summary['error']}")
+
+
+if __name__ == "__main__":
+    main()
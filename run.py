@@ -12,10 +12,18 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(ROOT_DIR))
 
+from src.ocr_backends import check_backend
 from src.pdf_renamer_gui import App
 
 
 def main():
+    try:
+        check_backend()
+    except ValueError as e:
+        from tkinter import messagebox
+
+        messagebox.showerror("PDF Auto Renamer", str(e))
+        sys.exit(2)
     app = App()
     app.mainloop()
 
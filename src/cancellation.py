@@ -0,0 +1,30 @@
+"""
+Cooperative cancellation.
+
+A CancelToken is passed down from a scan through discovery, text extraction
+and OCR. Each stage checks it between units of work (folders, files, pages,
+renders) and the OCR backend kills a running Tesseract process when it is
+set.
+"""
+
+import threading
+
+
+class Cancelled(Exception):
+    """Raised by CancelToken.raise_if_cancelled(); never cached or swallowed."""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled()
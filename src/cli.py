@@ -0,0 +1,249 @@
+"""
+Headless batch mode: propose and rename PDFs without Tk.
+
+    python -m src.cli plan INPUT... [-o plan.jsonl]
+    python -m src.cli apply plan.jsonl [--dry-run]
+    python -m src.cli rename INPUT... [--dry-run]
+
+INPUT is a folder (its PDFs are used; add -r to walk subfolders) or a PDF
+file. A plan is JSON Lines, one {"path": ..., "new_name": ...} object per
+file, and can be reviewed or edited before it is applied. apply and rename
+report one JSON line per file with its status; a missing input or a bad
+plan line is an error (exit status 2) before anything is renamed.
+--metrics FILE writes
+per-stage timings at the end, as JSON or, for a .prom file, in the
+Prometheus text format.
+"""
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import sys
+import time
+
+from .cancellation import CancelToken
+from .metrics import METRICS
+from .ocr_backends import check_backend
+from .ocr_pool import OcrPool
+from .renamer import rename_pdf
+from .scanner import DONE, ScanJob, iter_pdfs
+from .text_cache import TextCache
+
+# How often the progress line on stderr is redrawn.
+PROGRESS_INTERVAL_S = 0.5
+
+
+def _input_pdfs(args, cancel=None):
+    """Yield input PDFs lazily, so proposing starts while folders are walked."""
+    max_depth = args.max_depth if args.recursive else 0
+    include = args.include or ["*.pdf"]
+    for path in args.inputs:
+        if os.path.isdir(path):
+            yield from iter_pdfs(path, include=include, exclude=args.exclude, max_depth=max_depth, cancel=cancel)
+        elif path.lower().endswith(".pdf"):
+            yield path
+
+
+def _input_errors(args):
+    """One message per input that is neither a folder nor an existing PDF file."""
+    errors = []
+    for path in args.inputs:
+        if os.path.isdir(path):
+            continue
+        if not os.path.isfile(path):
+            errors.append(f"{path}: no such file or folder")
+        elif not path.lower().endswith(".pdf"):
+            errors.append(f"{path}: not a PDF file")
+    return errors
+
+
+def _iter_proposals(args):
+    """Yield (pdf_path, new_name) for the inputs, as workers finish them."""
+    cancel = CancelToken()
+    pdfs = _input_pdfs(args, cancel)
+
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = TextCache(args.cache) if args.cache else TextCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"warning: text cache unavailable, running without it: {e}", file=sys.stderr)
+    try:
+        with OcrPool(workers=args.workers) as pool:
+            job = ScanJob(
+                pdfs, workers=pool.workers, propose=pool.propose_new_name, cache=cache, cancel=cancel
+            ).start()
+            show_progress = args.progress or (args.progress is None and sys.stderr.isatty())
+            drawn = 0.0
+            try:
+                while True:
+                    try:
+                        item = job.results.get(timeout=PROGRESS_INTERVAL_S)
+                    except queue.Empty:
+                        item = None
+                    if show_progress and time.monotonic() - drawn >= PROGRESS_INTERVAL_S:
+                        drawn = time.monotonic()
+                        print(f"\r{job.progress.summary()}\033[K", end="", file=sys.stderr, flush=True)
+                    if item is None:
+                        continue
+                    if item is DONE:
+                        if show_progress:
+                            print(f"\r{job.progress.summary()}\033[K", file=sys.stderr)
+                        break
+                    pdf_path, new_name = item
+                    if new_name is not None:
+                        yield pdf_path, new_name
+            finally:
+                # On Ctrl-C, or if the consumer stopped early, stop the workers
+                # and any running OCR. After a normal finish this is a no-op.
+                job.cancel()
+                pool.cancel_all()
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _apply(entries, dry_run: bool, out) -> int:
+    """
+    Rename every (pdf_path, new_name); return the number of errors.
+
+    A target claimed by an earlier entry of the run is skipped, as the real
+    rename would find it taken, so --dry-run reports what a run would do.
+    """
+    counts = {"renamed": 0, "would-rename": 0, "skipped": 0, "error": 0}
+    claimed = set()
+    for pdf_path, new_name in entries:
+        target = os.path.normcase(os.path.abspath(os.path.join(os.path.dirname(pdf_path), new_name)))
+        if target in claimed:
+            status, new_path = "skipped", os.path.join(os.path.dirname(pdf_path), new_name)
+        else:
+            status, new_path = rename_pdf(pdf_path, new_name, dry_run=dry_run)
+            if status in ("renamed", "would-rename"):
+                claimed.add(target)
+        counts[status] += 1
+        out.write(json.dumps({"path": pdf_path, "new_path": new_path, "status": status}) + "\n")
+        out.flush()
+
+    done = f"Would rename: {counts['would-rename']}" if dry_run else f"Renamed: {counts['renamed']}"
+    print(f"{done}, Skipped (same/exist): {counts['skipped']}, Errors: {counts['error']}", file=sys.stderr)
+    return counts["error"]
+
+
+def _read_plan(path: str):
+    """
+    The (pdf_path, new_name) entries of a plan. The whole plan is checked
+    first: ValueError names the first bad line, before anything is renamed.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: not JSON ({e})") from None
+            if not isinstance(entry, dict) or not all(isinstance(entry.get(k), str) for k in ("path", "new_name")):
+                raise ValueError(f'{path}:{lineno}: expected {{"path": ..., "new_name": ...}} strings')
+            entries.append((entry["path"], entry["new_name"]))
+    return entries
+
+
+def cmd_plan(args) -> int:
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        count = 0
+        for pdf_path, new_name in _iter_proposals(args):
+            out.write(json.dumps({"path": pdf_path, "new_name": new_name}) + "\n")
+            out.flush()
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Planned {count} PDF(s).", file=sys.stderr)
+    return 0
+
+
+def cmd_apply(args) -> int:
+    try:
+        entries = _read_plan(args.plan)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 1 if _apply(entries, args.dry_run, sys.stdout) else 0
+
+
+def cmd_rename(args) -> int:
+    return 1 if _apply(_iter_proposals(args), args.dry_run, sys.stdout) else 0
+
+
+def _add_scan_args(p):
+    p.add_argument("inputs", nargs="+", help="PDF files or folders")
+    p.add_argument("-r", "--recursive", action="store_true", help="walk subfolders of input folders")
+    p.add_argument("--max-depth", type=int, default=None, help="with -r, how many folder levels to walk")
+    p.add_argument("--include", action="append", default=[], metavar="GLOB", help="file pattern to include (default: *.pdf)")
+    p.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="file or folder pattern to skip")
+    p.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    p.add_argument("--cache", default=None, help="text cache file (default: ~/.cache/pdf-renamer-gui)")
+    p.add_argument("--no-cache", action="store_true", help="don't read or write the text cache")
+    p.add_argument(
+        "--progress",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="show files/sec, OCR pages/sec and ETA on stderr (default: when stderr is a terminal)",
+    )
+    p.add_argument(
+        "--metrics",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="write per-stage timings to FILE: Prometheus text if it ends in .prom, else JSON (repeatable)",
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Rename PDFs from their content, without the GUI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("plan", help="propose new names and write a JSON Lines plan")
+    _add_scan_args(p)
+    p.add_argument("-o", "--output", default=None, help="plan file (default: stdout)")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("apply", help="rename files as listed in a plan")
+    p.add_argument("plan", help="JSON Lines plan written by 'plan'")
+    p.add_argument("--dry-run", action="store_true", help="only report what would be renamed")
+    p.set_defaults(func=cmd_apply)
+
+    p = sub.add_parser("rename", help="propose new names and rename straight away")
+    _add_scan_args(p)
+    p.add_argument("--dry-run", action="store_true", help="only report what would be renamed")
+    p.set_defaults(func=cmd_rename)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command in ("plan", "rename"):
+        errors = _input_errors(args)
+        try:
+            check_backend()
+        except ValueError as e:
+            errors.append(str(e))
+        for error in errors:
+            print(f"error: {error}", file=sys.stderr)
+        if errors:
+            return 2
+    try:
+        return args.func(args)
+    finally:
+        for path in getattr(args, "metrics", ()):
+            METRICS.write(path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
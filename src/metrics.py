@@ -0,0 +1,162 @@
+"""
+Per-stage timing of the naming pipeline.
+
+Each stage of proposing a name (hashing, opening the PDF, get_text,
+rasterizing, Tesseract, the line heuristics, ...) is timed with
+time.perf_counter and aggregated into a fixed-bucket histogram per stage.
+Counters record how often something happened (e.g. which way the
+text-layer gate decided). The aggregate can be exported as JSON or in the
+Prometheus text format (e.g. for node_exporter's textfile collector).
+
+Timings recorded in OCR worker processes are shipped back with each result
+and merged into the parent's METRICS, so one export covers the whole run.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds: float):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, counts, total, lo, hi):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.count += sum(counts)
+        self.sum += total
+        if lo is not None:
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+
+    def to_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(list(BUCKETS) + ["+Inf"], self.counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum_s": self.sum,
+            "mean_s": self.sum / self.count if self.count else 0.0,
+            "min_s": self.min,
+            "max_s": self.max,
+            "buckets": buckets,
+        }
+
+
+class StageMetrics:
+    """Thread-safe stage -> Histogram map, plus event counters."""
+
+    def __init__(self):
+        self._hists = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _hist(self, stage: str) -> Histogram:
+        hist = self._hists.get(stage)
+        if hist is None:
+            hist = self._hists[stage] = Histogram()
+        return hist
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self._hist(stage).observe(seconds)
+
+    def incr(self, event: str, n: int = 1):
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + n
+
+    def drain(self):
+        """Return the raw (picklable) state and reset, for shipping across processes."""
+        with self._lock:
+            hists = {s: (h.counts, h.sum, h.min, h.max) for s, h in self._hists.items()}
+            state = {"stages": hists, "counters": self._counters}
+            self._hists = {}
+            self._counters = {}
+        return state
+
+    def merge(self, state):
+        """Add a state returned by drain() (e.g. from an OCR worker)."""
+        with self._lock:
+            for stage, (counts, total, lo, hi) in state["stages"].items():
+                self._hist(stage).merge(counts, total, lo, hi)
+            for event, n in state["counters"].items():
+                self._counters[event] = self._counters.get(event, 0) + n
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self._hists = {}
+            self._counters = {}
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: hist.to_dict() for stage, hist in sorted(self._hists.items())}
+
+    def counters(self):
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def to_json(self) -> str:
+        return json.dumps({"stages": self.snapshot(), "counters": self.counters()}, indent=2)
+
+    def to_prometheus(self, prefix: str = "pdf_renamer") -> str:
+        name = f"{prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Time spent per pipeline stage.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, h in self.snapshot().items():
+            for bound, cumulative in h["buckets"].items():
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {h["sum_s"]}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {h["count"]}')
+        name = f"{prefix}_events_total"
+        lines += [f"# HELP {name} Pipeline events by kind.", f"# TYPE {name} counter"]
+        for event, n in self.counters().items():
+            lines.append(f'{name}{{event="{event}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write JSON, or Prometheus text if path ends in .prom. Atomic."""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+# Process-wide metrics the pipeline records into.
+METRICS = StageMetrics()
+
+
+def timed(stage: str):
+    """Time a block into METRICS: `with timed("get_text"): ...`."""
+    return METRICS.timer(stage)
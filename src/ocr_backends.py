@@ -0,0 +1,220 @@
+"""
+OCR engine backends.
+
+A backend turns a grayscale PyMuPDF pixmap into (text, mean confidence).
+PytesseractBackend starts a `tesseract` process per page, which reloads the
+language model every time, and kills it if the scan is cancelled.
+TesserocrBackend keeps Tesseract engines alive in-process and reuses them
+for every page, and takes raw pixels without an image file in between. It
+needs the optional `tesserocr` package.
+"""
+
+import importlib.util
+import os
+import subprocess
+import tempfile
+import threading
+
+from .cancellation import Cancelled
+
+# How often a running tesseract process is checked for cancellation.
+_CANCEL_POLL_S = 0.05
+
+
+class OcrBackend:
+    name = "base"
+    module = None  # the package the backend needs
+
+    def recognize(self, pix, lang: str, cancel=None):
+        """
+        Return (text, mean word confidence 0-100) for a 1-channel pixmap.
+        Raise Cancelled if `cancel` (a CancelToken) is set while working.
+        """
+        raise NotImplementedError
+
+    def preload(self):
+        """Import whatever the backend needs, ahead of the first page."""
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OcrBackend):
+    """
+    Runs the `tesseract` executable configured for pytesseract, one process
+    per page, and reads its TSV output. The process is started directly
+    rather than through pytesseract.image_to_data, so that it can be killed
+    as soon as the scan is cancelled.
+    """
+
+    name = "pytesseract"
+    module = "pytesseract"
+
+    def preload(self):
+        import pytesseract  # noqa: F401
+
+    def recognize(self, pix, lang: str, cancel=None):
+        import pytesseract
+
+        with tempfile.TemporaryDirectory(prefix="tess_") as tmp:
+            # Written straight from the pixmap buffer as an uncompressed PGM;
+            # no PIL copy and no PNG encoding.
+            image_path = os.path.join(tmp, "page.pgm")
+            pix.save(image_path)
+            out_base = os.path.join(tmp, "out")
+
+            proc = subprocess.Popen(
+                [pytesseract.pytesseract.tesseract_cmd, image_path, out_base, "-l", lang, "tsv"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+            while True:
+                try:
+                    proc.wait(timeout=_CANCEL_POLL_S)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel is not None and cancel.cancelled:
+                        proc.kill()
+                        proc.wait()
+                        raise Cancelled()
+            if proc.returncode != 0:
+                raise RuntimeError(f"tesseract exited with status {proc.returncode}")
+
+            with open(out_base + ".tsv", encoding="utf-8") as f:
+                rows = f.read().splitlines()
+
+        # TSV columns: level page_num block_num par_num line_num word_num
+        # left top width height conf text
+        lines = {}
+        confs = []
+        for row in rows[1:]:
+            cols = row.split("\t")
+            if len(cols) < 12 or not cols[11].strip():
+                continue
+            conf = float(cols[10])
+            if conf < 0:
+                continue
+            confs.append(conf)
+            lines.setdefault((cols[2], cols[3], cols[4]), []).append(cols[11])
+
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, (sum(confs) / len(confs) if confs else 0.0)
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    Persistent in-process Tesseract engines.
+
+    An engine is not thread-safe, so each call borrows an idle one for its
+    language (creating it on first use) and gives it back afterwards. The
+    language model is therefore loaded once per concurrent caller, not once
+    per page.
+    """
+
+    name = "tesserocr"
+    module = "tesserocr"
+
+    def __init__(self):
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self._idle = {}  # lang -> [PyTessBaseAPI]
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _acquire(self, lang: str):
+        with self._lock:
+            idle = self._idle.setdefault(lang, [])
+            if idle:
+                return idle.pop()
+        api = self._tesserocr.PyTessBaseAPI(lang=lang)
+        with self._lock:
+            self._all.append(api)
+        return api
+
+    def _release(self, lang: str, api):
+        with self._lock:
+            self._idle[lang].append(api)
+
+    def recognize(self, pix, lang: str, cancel=None):
+        # A running in-process recognition can't be interrupted; check first.
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        api = self._acquire(lang)
+        try:
+            api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+            return api.GetUTF8Text() or "", float(api.MeanTextConf())
+        finally:
+            api.Clear()
+            self._release(lang, api)
+
+    def close(self):
+        with self._lock:
+            for api in self._all:
+                api.End()
+            self._all.clear()
+            self._idle.clear()
+
+
+_BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def _configured():
+    """The backend class PDF_RENAMER_OCR_BACKEND names, or None if it is unset."""
+    wanted = os.environ.get("PDF_RENAMER_OCR_BACKEND", "").strip().lower()
+    if not wanted:
+        return None
+    if wanted not in _BACKENDS:
+        raise ValueError(
+            f"PDF_RENAMER_OCR_BACKEND={wanted!r} is not an OCR backend; use {' or '.join(sorted(_BACKENDS))}"
+        )
+    return _BACKENDS[wanted]
+
+
+def _not_installed(cls) -> ValueError:
+    return ValueError(f"PDF_RENAMER_OCR_BACKEND={cls.name!r}, but the {cls.module!r} package is not installed")
+
+
+def check_backend():
+    """
+    Raise ValueError, with a message for the user, if PDF_RENAMER_OCR_BACKEND
+    names an unknown backend or one whose package is missing.
+
+    Call it once at startup: during a scan such an error would only show up
+    as every scanned file keeping a fallback name. Nothing is imported.
+    """
+    cls = _configured()
+    if cls is not None and importlib.util.find_spec(cls.module) is None:
+        raise _not_installed(cls)
+
+
+def get_backend() -> OcrBackend:
+    """
+    The process-wide OCR backend.
+
+    Set PDF_RENAMER_OCR_BACKEND to "pytesseract" or "tesserocr" to choose one;
+    otherwise tesserocr is used when it is installed. An invalid setting
+    raises ValueError (see check_backend).
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            cls = _configured()
+            if cls is not None:
+                try:
+                    _default = cls()
+                except ImportError:
+                    raise _not_installed(cls) from None
+            else:
+                try:
+                    _default = TesserocrBackend()
+                except ImportError:
+                    _default = PytesseractBackend()
+        return _default
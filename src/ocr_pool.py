@@ -0,0 +1,220 @@
+"""
+Process-pool OCR backend.
+
+pytesseract and page rendering are CPU bound, and PyMuPDF must not be
+used from several threads of one process at once, so whole proposals run
+in worker processes (OcrPool.propose_new_name). Each worker opens the PDF,
+reads and OCRs it by itself, and only the name is sent back to the parent:
+the scan threads only hand out paths and collect names. The worker
+processes are long-lived, so each keeps its OCR backend (see ocr_backends)
+and, with tesserocr, its loaded language model for every page it handles.
+When a worker
+crashes on a malformed PDF, the pool is replaced and the other tasks it
+took down are retried (see OcrPool._run).
+"""
+
+import os
+import sqlite3
+import threading
+
+from .cancellation import Cancelled
+from .metrics import METRICS
+from .renamer import preload, propose_new_name
+from .text_cache import TextCache
+
+# How often a waiting caller checks its CancelToken.
+_CANCEL_POLL_S = 0.05
+
+# Set in each worker process: the pool's shared generation counter.
+_generation = None
+# Per worker process: cache path -> its own TextCache connection.
+_caches = {}
+
+
+def _init_worker(generation):
+    global _generation
+    _generation = generation
+    preload()
+
+
+def _warm_task():
+    # Nothing to do: starting the worker (_init_worker) is the point.
+    return None
+
+
+class _GenerationToken:
+    """Worker-side cancel token: set once OcrPool.cancel_all() moved past `generation`."""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+
+    @property
+    def cancelled(self) -> bool:
+        return _generation is not None and _generation.value != self.generation
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise Cancelled()
+
+
+def _worker_cache(path):
+    # An in-memory cache can't be shared with another process.
+    if path is None or path == ":memory:":
+        return None
+    if path not in _caches:
+        try:
+            _caches[path] = TextCache(path)
+        except (OSError, sqlite3.Error):
+            # The parent opened this file, so this is rare; don't retry it
+            # for every task.
+            _caches[path] = None
+    return _caches[path]
+
+
+def _propose_task(pdf_path: str, cache_path, generation: int):
+    METRICS.drain()
+    info = {}
+    try:
+        # OCR runs right here: this already is a worker process.
+        cancel = _GenerationToken(generation)
+        name = propose_new_name(pdf_path, cache=_worker_cache(cache_path), cancel=cancel, info=info)
+    finally:
+        timings = METRICS.drain()
+    return name, info, timings
+
+
+class OcrPool:
+    """
+    A pool of worker processes that propose names and OCR in-process.
+
+    A CancelToken can't reach another process, so cancellation goes through
+    a shared generation counter: cancel_all() bumps it, and every task that
+    was submitted before the bump stops at its next check, killing its
+    running tesseract process.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self._executor = None
+        self._generation = None
+        self._lock = threading.Lock()
+        self._retry_lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use: importing multiprocessing is not free, and
+        # scans answered from the cache never need a worker process.
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # Always spawn: the pool starts while scan threads are running,
+                # and a forked worker can inherit a lock one of them held
+                # (PyMuPDF, imports, ...) and hang on it forever.
+                ctx = multiprocessing.get_context("spawn")
+                self._generation = ctx.Value("i", 0)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(self._generation,),
+                )
+            return self._executor
+
+    def _submit(self, fn, args, cancel):
+        # Not the builtin TimeoutError before Python 3.11.
+        from concurrent.futures import TimeoutError as FutureTimeout
+        from concurrent.futures.process import BrokenProcessPool
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args, self._generation.value)
+            while True:
+                try:
+                    return future.result(timeout=_CANCEL_POLL_S)
+                except FutureTimeout:
+                    if cancel is not None and cancel.cancelled:
+                        future.cancel()
+                        raise Cancelled()
+        except BrokenProcessPool:
+            # A worker died (e.g. PyMuPDF crashed on a broken file). Start a
+            # new pool for the next task instead of failing every later one.
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def _run(self, fn, *args, cancel=None):
+        """
+        Run fn(*args, generation) in a worker and wait for its result.
+
+        When a worker dies, every task in flight fails with it, not just the
+        one that crashed it. So a task whose pool broke is retried once on
+        the new pool, and retries run one at a time: a file that crashes its
+        worker again only takes itself (and first attempts) down. A task
+        whose pool breaks twice raises BrokenProcessPool.
+        """
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            return self._submit(fn, args, cancel)
+        except BrokenProcessPool:
+            pass
+        while not self._retry_lock.acquire(timeout=_CANCEL_POLL_S):
+            if cancel is not None and cancel.cancelled:
+                raise Cancelled()
+        try:
+            return self._submit(fn, args, cancel)
+        finally:
+            self._retry_lock.release()
+
+    def propose_new_name(self, pdf_path: str, cache=None, cancel=None, info=None) -> str:
+        """
+        renamer.propose_new_name, run in a worker process, which OCRs
+        in-process. The worker opens its own connection to `cache`'s file (an
+        in-memory cache is not used). If `cancel` is set while waiting, the
+        task is abandoned and Cancelled is raised; call cancel_all() to also
+        stop work already running. Errors in the worker are raised here, and
+        so is a crash if the retry crashes too (see _run).
+        """
+        cache_path = cache.path if cache is not None else None
+        name, task_info, timings = self._run(_propose_task, pdf_path, cache_path, cancel=cancel)
+        METRICS.merge(timings)
+        if info is not None:
+            info.update(task_info)
+        return name
+
+    def preload(self):
+        """
+        Start every worker process now, each importing PyMuPDF and the OCR
+        backend, so the first scan doesn't wait for them. Blocks until the
+        workers are up; the GUI calls it on a background thread.
+        """
+        executor = self._get_executor()
+        futures = [executor.submit(_warm_task) for _ in range(self.workers)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+    def cancel_all(self):
+        """Stop every task submitted so far, including running tesseract work."""
+        with self._lock:
+            if self._generation is not None:
+                with self._generation.get_lock():
+                    self._generation.value += 1
+
+    def close(self):
+        self.cancel_all()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
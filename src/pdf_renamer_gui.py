@@ -1,118 +1,185 @@
+import itertools
 import os
-import re
+import queue
+import sqlite3
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
-import fitz  # PyMuPDF
-from PIL import Image
-import pytesseract
-
-
-def safe_filename(name: str) -> str:
-    name = name.strip()
-    name = re.sub(r"[\\/:\*\?\"<>\|]", "-", name)
-    name = re.sub(r"\s+", " ", name)
-    return name
-
-
-def extract_text_from_pdf(pdf_path: str, max_pages: int = 2) -> str:
-    """Try normal text extraction first (works for non-scanned PDFs)."""
-    text_chunks = []
-    try:
-        doc = fitz.open(pdf_path)
-        pages_to_read = min(len(doc), max_pages)
-        for i in range(pages_to_read):
-            page = doc.load_page(i)
-            txt = page.get_text("text") or ""
-            if txt.strip():
-                text_chunks.append(txt)
-        doc.close()
-    except Exception:
-        return ""
-
-    return "\n".join(text_chunks).strip()
-
-
-def ocr_first_pages(pdf_path: str, max_pages: int = 1) -> str:
+from .renamer import rename_pdf
+from .scanner import ScanJob, DONE, iter_pdfs
+from .cancellation import CancelToken
+from .metrics import METRICS
+from .progress import ProgressTracker
+from .ocr_pool import OcrPool
+from .text_cache import TextCache
+from .results_model import ResultsModel
+
+# How often the UI drains scan results, and for how long at most per tick.
+SCAN_POLL_MS = 50
+SCAN_DRAIN_BUDGET_S = 0.010
+# The table and status line are redrawn at most this often, or once this many
+# results are pending, however fast results arrive.
+UI_FLUSH_INTERVAL_S = 0.100
+UI_FLUSH_MAX_ITEMS = 500
+# The progress line is redrawn at least this often while a job runs, even if
+# no new rows arrived (e.g. during long OCR).
+PROGRESS_DRAW_INTERVAL_S = 0.5
+# Time spent renaming per Tk tick before the UI gets control back.
+RENAME_STEP_BUDGET_S = 0.050
+
+
+class UpdateCoalescer:
     """
-    OCR fallback for scanned PDFs.
-    Render page as image using PyMuPDF, then run Tesseract OCR.
+    Collect items and pass them to `flush` in batches: as soon as `max_items`
+    are pending, otherwise at most once every `interval` seconds.
     """
-    try:
-        doc = fitz.open(pdf_path)
-        pages_to_read = min(len(doc), max_pages)
-        ocr_text = []
 
-        for i in range(pages_to_read):
-            page = doc.load_page(i)
+    def __init__(self, flush, interval: float = UI_FLUSH_INTERVAL_S, max_items: int = UI_FLUSH_MAX_ITEMS):
+        self._flush = flush
+        self.interval = interval
+        self.max_items = max_items
+        self._pending = []
+        self._last = time.monotonic()
 
-            # Higher zoom = better OCR but slower
-            mat = fitz.Matrix(2, 2)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
+    def add(self, item):
+        self._pending.append(item)
+        if len(self._pending) >= self.max_items:
+            self.flush()
 
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            txt = pytesseract.image_to_string(img) or ""
-            if txt.strip():
-                ocr_text.append(txt)
+    def maybe_flush(self):
+        if self._pending and time.monotonic() - self._last >= self.interval:
+            self.flush()
 
-        doc.close()
-        return "\n".join(ocr_text).strip()
-    except Exception:
-        return ""
+    def flush(self):
+        items, self._pending = self._pending, []
+        self._last = time.monotonic()
+        self._flush(items)
 
 
-def propose_new_name(pdf_path: str) -> str:
-    """
-    Suggest rename:
-    1) Extract selectable text
-    2) If empty -> OCR page 1
+class VirtualTable(ttk.Frame):
     """
-    base = os.path.splitext(os.path.basename(pdf_path))[0]
+    A Treeview that shows a window of a ResultsModel.
 
-    text = extract_text_from_pdf(pdf_path)
-    if not text:
-        text = ocr_first_pages(pdf_path, max_pages=1)
-
-    if not text:
-        return safe_filename(base) + ".pdf"
-
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    lines = [ln for ln in lines if len(ln) >= 3]
-
-    company = ""
-    for ln in lines[:30]:
-        letters = sum(ch.isalpha() for ch in ln)
-        digits = sum(ch.isdigit() for ch in ln)
-        if letters >= 6 and letters > digits:
-            company = ln
-            break
+    Only the rows that fit on screen exist as Treeview items; scrolling
+    refills those items from the model, so the cost of adding rows and the
+    Tk memory use stay flat however many files are listed.
+    """
 
-    desc = ""
-    for ln in lines[:60]:
-        if company and ln == company:
-            continue
-        if len(ln) >= 6:
-            desc = ln
-            break
+    def __init__(self, master, model, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self._first = 0
+        self._visible = 18
 
-    if not company and not desc:
-        return safe_filename(base) + ".pdf"
+        columns = ("original", "new")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=self._visible)
+        self.tree.heading("original", text="Original filename")
+        self.tree.heading("new", text="New filename")
+        self.tree.column("original", width=450, anchor="w")
+        self.tree.column("new", width=450, anchor="w")
 
-    company = company[:60].strip()
-    desc = desc[:80].strip()
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
 
-    new_base = f"{company} - {desc}" if (company and desc) else (company or desc)
-    return safe_filename(new_base) + ".pdf"
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self._visible))
+        self.tree.bind("<Next>", lambda e: self.scroll(self._visible))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+
+    def _row_height(self) -> int:
+        try:
+            return int(ttk.Style(self).lookup("Treeview", "rowheight")) or 20
+        except (tk.TclError, ValueError):
+            return 20
+
+    def _on_resize(self, event):
+        # One row's worth of height goes to the headings.
+        rows = max(1, event.height // self._row_height() - 1)
+        if rows != self._visible:
+            self._visible = rows
+            self.refresh()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._first = int(float(args[1]) * len(self.model))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self._first += step * self._visible if args[2] == "pages" else step
+        self.refresh()
+
+    def _on_arrow(self, step: int):
+        # Arrow keys move within the materialized rows; at an edge, scroll.
+        items = self.tree.get_children()
+        if items and self.tree.focus() == (items[0] if step < 0 else items[-1]):
+            self.scroll(step)
+            return "break"
+        return None
+
+    def scroll(self, rows: int):
+        self._first += rows
+        self.refresh()
+
+    def refresh(self):
+        """Re-fill the visible rows from the model."""
+        total = len(self.model)
+        self._first = max(0, min(self._first, total - self._visible))
+        rows = self.model.rows(self._first, self._first + self._visible)
+
+        items = self.tree.get_children()
+        for i, (pdf_path, new_name) in enumerate(rows):
+            values = (os.path.basename(pdf_path), new_name)
+            if i < len(items):
+                self.tree.item(items[i], values=values)
+            else:
+                self.tree.insert("", "end", values=values)
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+
+        if total:
+            self.scrollbar.set(self._first / total, min(1.0, (self._first + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
 
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, ocr_workers=None, cache_path=None):
         super().__init__()
         self.title("PDF Auto Renamer")
         self.geometry("980x560")
 
         self.selected_files = []
+        self._scan_job = None
+        self._scan_count = 0
+        self.results = ResultsModel()
+        self._renaming = False
+        self._rename_after = None  # pending _rename_step callback
+        self._progress_drawn = 0.0
+        self._stats = {}  # pdf_path -> stat_key when it was last proposed
+        self.ocr_pool = OcrPool(workers=ocr_workers)
+        try:
+            self.text_cache = TextCache(cache_path) if cache_path else TextCache()
+            cache_error = None
+        except (OSError, sqlite3.Error) as e:
+            # An unwritable cache only costs speed: scan without one.
+            self.text_cache = None
+            cache_error = e
         self._build_ui()
+        if cache_error is not None:
+            self.info_var.set(f"Warning: text cache unavailable, scanning without it ({cache_error}).")
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Start the worker processes (which load PyMuPDF and the OCR engine)
+        # once the window is showing, so the first scan doesn't wait for them.
+        # The GUI process itself never opens a PDF.
+        self.after_idle(lambda: threading.Thread(target=self.ocr_pool.preload, daemon=True).start())
 
     def _build_ui(self):
         top = ttk.Frame(self, padding=10)
@@ -124,30 +191,82 @@ class App(tk.Tk):
         self.folder_entry = ttk.Entry(top, textvariable=self.folder_var, width=70)
         self.folder_entry.pack(side="left", padx=(8, 8))
 
-        ttk.Button(top, text="Browse Folder", command=self.on_browse_folder).pack(side="left", padx=(0, 8))
-        ttk.Button(top, text="Select PDFs", command=self.on_select_pdfs).pack(side="left", padx=(0, 8))
-        ttk.Button(top, text="Rename", command=self.on_rename).pack(side="left")
+        self.recursive_var = tk.BooleanVar(value=False)
+        recursive = ttk.Checkbutton(
+            top, text="Subfolders", variable=self.recursive_var, command=self.on_toggle_recursive
+        )
+        recursive.pack(side="left", padx=(0, 8))
+
+        browse = ttk.Button(top, text="Browse Folder", command=self.on_browse_folder)
+        browse.pack(side="left", padx=(0, 8))
+        select = ttk.Button(top, text="Select PDFs", command=self.on_select_pdfs)
+        select.pack(side="left", padx=(0, 8))
+        rename = ttk.Button(top, text="Rename", command=self.on_rename)
+        rename.pack(side="left", padx=(0, 8))
+        ttk.Button(top, text="Export Metrics", command=self.on_export_metrics).pack(side="left")
+        # Disabled while renaming: the refresh afterwards rescans this input.
+        self._input_widgets = (self.folder_entry, recursive, browse, select, rename)
 
         self.info_var = tk.StringVar(value="Tip: Choose folder or Select PDFs. Names will auto-preview.")
         ttk.Label(self, textvariable=self.info_var, padding=(10, 0, 10, 8)).pack(fill="x")
 
-        table_frame = ttk.Frame(self, padding=(10, 0, 10, 10))
-        table_frame.pack(fill="both", expand=True)
-
-        columns = ("original", "new")
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=18)
-        self.tree.heading("original", text="Original filename")
-        self.tree.heading("new", text="New filename")
-        self.tree.column("original", width=450, anchor="w")
-        self.tree.column("new", width=450, anchor="w")
+        progress_frame = ttk.Frame(self, padding=(10, 0, 10, 8))
+        progress_frame.pack(fill="x")
+        self.progress_bar = ttk.Progressbar(progress_frame, mode="determinate", maximum=100, length=220)
+        self.progress_bar.pack(side="left")
+        self.progress_var = tk.StringVar(value="")
+        ttk.Label(progress_frame, textvariable=self.progress_var, padding=(8, 0, 0, 0)).pack(side="left", fill="x")
+
+        self.table = VirtualTable(self, self.results, padding=(10, 0, 10, 10))
+        self.table.pack(fill="both", expand=True)
+
+    def on_close(self):
+        if self._rename_after is not None:
+            self.after_cancel(self._rename_after)
+            self._rename_after = None
+        self._cancel_scan()
+        self.ocr_pool.close()
+        if self.text_cache is not None:
+            self.text_cache.close()
+        # Unattended runs can collect timings without the dialog.
+        metrics_path = os.environ.get("PDF_RENAMER_METRICS")
+        if metrics_path:
+            try:
+                METRICS.write(metrics_path)
+            except OSError:
+                pass
+        self.destroy()
+
+    def on_export_metrics(self):
+        path = filedialog.asksaveasfilename(
+            title="Export stage timings",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus text", "*.prom")],
+        )
+        if not path:
+            return
+        try:
+            METRICS.write(path)
+        except OSError as e:
+            messagebox.showerror("Export failed", str(e))
+            return
+        self.info_var.set(f"Stage timings written to {path}")
 
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+    def _rename_busy(self) -> bool:
+        """True (after telling the user) while a rename is running."""
+        if self._renaming:
+            messagebox.showinfo("Rename in progress", "Wait for the rename to finish before scanning again.")
+        return self._renaming
 
-        self.tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+    def _set_renaming(self, renaming: bool):
+        self._renaming = renaming
+        for widget in self._input_widgets:
+            widget.configure(state="disabled" if renaming else "normal")
 
     def on_browse_folder(self):
+        # Checked before the dialog: the folder must not change under a rename.
+        if self._rename_busy():
+            return
         folder = filedialog.askdirectory()
         if folder:
             self.folder_var.set(folder)
@@ -155,7 +274,14 @@ class App(tk.Tk):
             self.info_var.set(f"Folder mode: {folder}")
             self.on_scan()  # ✅ auto preview
 
+    def on_toggle_recursive(self):
+        # Only a folder scan depends on it; selected files are kept as they are.
+        if not self.selected_files and self.folder_var.get().strip():
+            self.on_scan()
+
     def on_select_pdfs(self):
+        if self._rename_busy():
+            return
         paths = filedialog.askopenfilenames(
             title="Select PDF files",
             filetypes=[("PDF files", "*.pdf")],
@@ -165,72 +291,194 @@ class App(tk.Tk):
             self.info_var.set(f"Selected files mode: {len(self.selected_files)} PDF(s) selected")
             self.on_scan()  # ✅ auto preview
 
-    def _get_input_pdfs(self):
+    def _get_input_pdfs(self, cancel=None):
+        """
+        The selected files, or a lazy walk of the folder (streamed to the scan
+        workers as files are found, and stopped by `cancel`). None when there
+        is no input.
+        """
         if self.selected_files:
             return self.selected_files
 
         folder = self.folder_var.get().strip()
         if not folder or not os.path.isdir(folder):
-            return []
+            return None
+
+        return iter_pdfs(folder, max_depth=None if self.recursive_var.get() else 0, cancel=cancel)
 
-        pdfs = []
-        for name in os.listdir(folder):
-            if name.lower().endswith(".pdf"):
-                pdfs.append(os.path.join(folder, name))
-        pdfs.sort()
-        return pdfs
+    def _cancel_scan(self):
+        if self._scan_job is not None:
+            self._scan_job.cancel()
+            # Also stop OCR already running in the worker processes.
+            self.ocr_pool.cancel_all()
+            self._scan_job = None
+
+    def _draw_progress(self, progress, label: str, found=None, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._progress_drawn < PROGRESS_DRAW_INTERVAL_S:
+            return
+        self._progress_drawn = now
+
+        fraction = progress.fraction()
+        if fraction is None and found:
+            # Still discovering: measure against what has been found so far.
+            fraction = min(1.0, progress.done / found)
+        self.progress_bar["value"] = (fraction or 0.0) * 100
+        self.progress_var.set(f"{label}: {progress.summary()}")
 
     def on_scan(self):
+        if self._rename_busy():
+            return
+
+        # A new scan makes the running one's results useless; stop it now.
+        self._cancel_scan()
+
         # Clear table
-        self.tree.delete(*self.tree.get_children())
+        self.results.clear()
+        self.table.refresh()
+        self._stats = {}
 
-        pdfs = self._get_input_pdfs()
-        if not pdfs:
+        cancel = CancelToken()
+        pdfs = self._get_input_pdfs(cancel)
+        if pdfs is None:
             self.info_var.set("No input yet. Choose a folder OR click 'Select PDFs'.")
             return
 
-        count = 0
-        for pdf_path in pdfs:
-            original = os.path.basename(pdf_path)
-            new_name = propose_new_name(pdf_path)
-            self.tree.insert("", "end", values=(original, new_name), tags=(pdf_path,))
-            count += 1
+        self.info_var.set("Scanning...")
+        self._start_scan(pdfs, cancel=cancel)
+
+    def _start_scan(self, pdfs, known=None, cancel=None):
+        self._scan_count = 0
+        self._scan_incremental = known is not None
+        # Proposals run in the pool's processes (PyMuPDF is not thread-safe);
+        # one scan thread per process keeps them all busy.
+        job = self._scan_job = ScanJob(
+            pdfs,
+            workers=self.ocr_pool.workers,
+            propose=self.ocr_pool.propose_new_name,
+            cache=self.text_cache,
+            known=known,
+            cancel=cancel,
+        ).start()
+        self._updates = UpdateCoalescer(lambda items: self._apply_results(job, items))
+        self.after(SCAN_POLL_MS, self._poll_scan, job)
+
+    def _poll_scan(self, job):
+        # A newer scan replaced this one; drop its results.
+        if job is not self._scan_job:
+            return
 
+        # Draining is cheap; the table and status line are only touched when
+        # the coalescer flushes.
+        deadline = time.monotonic() + SCAN_DRAIN_BUDGET_S
+        while time.monotonic() < deadline:
+            try:
+                item = job.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is DONE:
+                self._updates.flush()
+                self._finish_scan(job)
+                return
+            self._updates.add(item)
+
+        self._updates.maybe_flush()
+        self._draw_progress(job.progress, "Scan", found=job.discovered)
+        self.after(SCAN_POLL_MS, self._poll_scan, job)
+
+    def _apply_results(self, job, items):
+        for pdf_path, new_name in items:
+            if new_name is None:
+                # File disappeared since it was listed.
+                self.results.remove(pdf_path)
+                self._stats.pop(pdf_path, None)
+                continue
+
+            self.results.set(pdf_path, new_name)
+            self._scan_count += 1
+
+        self.table.refresh()
+        found = f"{job.discovered}" if job.discovery_done else f"{job.discovered}+"
+        self.info_var.set(f"Scanning... {self._scan_count}/{found} PDF(s)")
+        self._draw_progress(job.progress, "Scan", found=job.discovered, force=True)
+
+    def _finish_scan(self, job):
+        self._scan_job = None
+        self._stats.update(job.stats)
+        self.table.refresh()
+        self._draw_progress(job.progress, "Scan", force=True)
         mode = "Selected files" if self.selected_files else "Folder"
-        self.info_var.set(f"{mode}: scanned {count} PDF(s). Review names, then click Rename.")
+        if not len(self.results):
+            self.info_var.set(f"{mode}: no PDF files found.")
+        elif self._scan_incremental:
+            self.info_var.set(f"{mode}: {len(self.results)} PDF(s), {self._scan_count} changed since last scan.")
+        else:
+            self.info_var.set(f"{mode}: scanned {self._scan_count} PDF(s). Review names, then click Rename.")
 
     def on_rename(self):
-        rows = self.tree.get_children()
+        if self._renaming:
+            return
+
+        rows = self.results.rows(0, len(self.results))
         if not rows:
             messagebox.showinfo("Nothing to rename", "No files in the list yet. Choose a folder or Select PDFs first.")
             return
 
-        renamed = 0
-        skipped = 0
-        errors = 0
-
-        for row_id in rows:
-            original_name, new_name = self.tree.item(row_id, "values")
-            pdf_path = self.tree.item(row_id, "tags")[0]
-
-            folder = os.path.dirname(pdf_path)
-            new_path = os.path.join(folder, new_name)
-
-            if os.path.abspath(pdf_path) == os.path.abspath(new_path):
-                skipped += 1
-                continue
+        if self._scan_job is not None:
+            messagebox.showinfo("Scan in progress", "Wait for the preview to finish before renaming.")
+            return
 
-            if os.path.exists(new_path):
-                skipped += 1
-                continue
+        # Renaming runs in time-boxed steps on the Tk loop, so the progress
+        # line keeps updating on slow shares.
+        self._set_renaming(True)
+        progress = ProgressTracker(total=len(rows))
+        self._draw_progress(progress, "Rename", force=True)
+        self._rename_after = self.after(0, self._rename_step, iter(rows), progress, {})
+
+    def _rename_step(self, rows, progress, moved):
+        self._rename_after = None
+        deadline = time.monotonic() + RENAME_STEP_BUDGET_S
+        for pdf_path, new_name in rows:
+            status, new_path = rename_pdf(pdf_path, new_name)
+            progress.record(status)
+            if status == "renamed":
+                # Only the path changed: update the row in place and carry its
+                # stat entry over, so the refresh below does not re-extract it.
+                moved[pdf_path] = new_path
+                self.results.move(pdf_path, new_path)
+                if pdf_path in self._stats:
+                    self._stats[new_path] = self._stats.pop(pdf_path)
+
+            if time.monotonic() >= deadline:
+                self.table.refresh()
+                self._draw_progress(progress, "Rename")
+                self._rename_after = self.after(1, self._rename_step, rows, progress, moved)
+                return
+
+        self._set_renaming(False)
+        if self.selected_files:
+            self.selected_files = [moved.get(p, p) for p in self.selected_files]
+        self.table.refresh()
+        self._draw_progress(progress, "Rename", force=True)
+
+        counts = progress.by_source
+        messagebox.showinfo(
+            "Done",
+            f"Renamed: {counts['renamed']}\nSkipped (same/exist): {counts['skipped']}\nErrors: {counts['error']}",
+        )
 
-            try:
-                os.rename(pdf_path, new_path)
-                renamed += 1
-            except Exception:
-                errors += 1
+        # Refresh the preview after rename: only files that are new or whose
+        # content changed get a new proposal.
+        self._refresh()
 
-        messagebox.showinfo("Done", f"Renamed: {renamed}\nSkipped (same/exist): {skipped}\nErrors: {errors}")
+    def _refresh(self):
+        listed = self.results.paths()
+        seen = set(listed)
+        # Files added since the last scan are streamed in from a fresh walk.
+        cancel = CancelToken()
+        found = self._get_input_pdfs(cancel) or []
+        pdfs = itertools.chain(listed, (p for p in found if p not in seen))
 
-        # Refresh the preview after rename
-        self.on_scan()
+        self.info_var.set("Checking for changes...")
+        self._start_scan(pdfs, known=dict(self._stats), cancel=cancel)
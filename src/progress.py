@@ -0,0 +1,91 @@
+"""
+Progress accounting for scans and renames.
+
+ProgressTracker counts finished files by how they were handled (text layer,
+OCR fallback, ...) and OCR'd pages, and derives files/sec, pages/sec and an
+ETA from a moving window of recent completions. That makes a slow share
+(files/sec drops across the board) distinguishable from a slow OCR stage
+(pages/sec is the limit). It is thread-safe, so scan workers can record
+into it directly.
+"""
+
+import collections
+import threading
+import time
+
+# Seconds of recent completions the rates and ETA are computed from.
+RATE_WINDOW_S = 10.0
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+class ProgressTracker:
+    def __init__(self, total=None, window_s: float = RATE_WINDOW_S):
+        self.total = total
+        self.window_s = window_s
+        self.done = 0
+        self.ocr_pages = 0
+        self.by_source = collections.Counter()
+        self.started = time.monotonic()
+
+        self._recent = collections.deque()  # (time, files, ocr_pages)
+        self._lock = threading.Lock()
+
+    def record(self, source: str = None, ocr_pages: int = 0, files: int = 1):
+        now = time.monotonic()
+        with self._lock:
+            self.done += files
+            self.ocr_pages += ocr_pages
+            if source:
+                self.by_source[source] += files
+            self._recent.append((now, files, ocr_pages))
+            self._trim(now)
+
+    def _trim(self, now: float):
+        while self._recent and now - self._recent[0][0] > self.window_s:
+            self._recent.popleft()
+
+    def rates(self):
+        """(files/sec, OCR pages/sec) over the moving window."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            files = sum(r[1] for r in self._recent)
+            pages = sum(r[2] for r in self._recent)
+        # Early on the window is not full yet; use the time actually covered.
+        span = min(self.window_s, now - self.started)
+        if span <= 0:
+            return 0.0, 0.0
+        return files / span, pages / span
+
+    def eta_s(self):
+        """Seconds left at the current rate, or None if unknown."""
+        if self.total is None:
+            return None
+        files_per_s, _ = self.rates()
+        if files_per_s <= 0:
+            return None
+        return max(0, self.total - self.done) / files_per_s
+
+    def fraction(self):
+        if not self.total:
+            return None
+        return min(1.0, self.done / self.total)
+
+    def summary(self) -> str:
+        files_per_s, pages_per_s = self.rates()
+        total = "?" if self.total is None else str(self.total)
+        parts = [f"{self.done}/{total} files", f"{files_per_s:.1f} files/s"]
+        if self.ocr_pages:
+            parts.append(f"{pages_per_s:.1f} OCR pages/s")
+        if self.by_source:
+            parts.append(" / ".join(f"{name} {count}" for name, count in sorted(self.by_source.items())))
+        eta = self.eta_s()
+        if eta is not None and self.done < (self.total or 0):
+            parts.append(f"ETA {format_duration(eta)}")
+        return " · ".join(parts)
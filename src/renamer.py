@@ -0,0 +1,900 @@
+import math
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+
+from .cancellation import Cancelled
+from .metrics import METRICS, timed
+from .ocr_backends import get_backend
+
+# PyMuPDF is imported inside the functions that use it, so importing this
+# module (and opening the GUI) doesn't pay its import cost up front.
+
+# PyMuPDF is not thread-safe: two threads using it at once can crash the
+# interpreter (e.g. on malformed files). propose_new_name holds this for the
+# whole proposal; to propose in parallel use processes (see ocr_pool).
+_PYMUPDF_LOCK = threading.Lock()
+
+# Tesseract language used for the OCR fallback.
+OCR_LANG = "eng"
+# OCR first renders at the lowest DPI and only moves to the next one when
+# Tesseract's mean word confidence or the number of usable lines is too low.
+OCR_DPI_STEPS = (150, 300)
+OCR_MIN_CONFIDENCE = 60
+OCR_MIN_LINES = 2
+# Upper bound on rendered pixels, so large-format pages don't become huge bitmaps.
+OCR_MAX_PIXELS = 12_000_000
+# Fraction of page 1, from the top, that is OCR'd before trying the full page.
+OCR_HEADER_FRACTION = 0.3
+# Fraction of page 1, from the top, whose text is read first; the rest of the
+# page is only extracted if the naming heuristic needs more lines.
+TEXT_HEADER_FRACTION = 0.4
+# Layout-aware company detection: only lines in this top fraction of page 1
+# are ranked, and a line must be this much larger than the body text to be
+# taken over the first-line rule; bold only ranks it higher.
+LAYOUT_MAX_Y_FRACTION = 0.5
+LAYOUT_MIN_SIZE_RATIO = 1.2
+# Part of the text cache key: bump when _layout_company's ranking changes,
+# so lines cached under the old ranking are not reused.
+LAYOUT_RANKING_VERSION = 3
+# Text-layer quality gate (see text_layer_decision). Below these the text
+# layer is junk (e.g. a bad OCR layer or broken font encoding) ...
+TEXT_MIN_ALPHA_RATIO = 0.5
+TEXT_MIN_ENTROPY = 2.5
+# ... and below this many glyphs it is sparse (e.g. a stamp on a scan).
+TEXT_MIN_GLYPHS = 40
+# Share of page 1 covered by images above which it is taken to be a scan.
+SCAN_MIN_IMAGE_COVERAGE = 0.5
+# A single upright image covering this much of a page is the scan itself: at
+# its own resolution it is decoded for OCR instead of rendering the page.
+FULL_PAGE_IMAGE_COVERAGE = 0.9
+DIRECT_DPI_TOLERANCE = 0.05
+# Document info / XMP values must score at least this to name a file from
+# them (see _metadata_score and read_metadata_name).
+METADATA_MIN_SCORE = 0.6
+# Score taken off metadata from office suites, which fill in /Author with
+# the user's name and /Title with whatever the template said.
+METADATA_OFFICE_PENALTY = 0.3
+
+# Metadata values that say nothing about the document.
+_METADATA_JUNK = re.compile(
+    r"^(untitled( document)?([ _-]?\d+)?|document ?\d*|new document"
+    r"|scan(ned)?( (document|image))?([ _-]?\d[\d .:_-]*)?|image ?\d*|page ?\d+|print"
+    r"|microsoft (word|excel|powerpoint) - .*|.*\.(docx?|xlsx?|pptx?|odt|rtf|txt|html?|pdf|tiff?|jpe?g|png)"
+    r"|admin(istrator)?|user|owner|unknown|none|n/?a|default)$",
+    re.IGNORECASE,
+)
+# Software and devices that fill in Author/Title on their own.
+_METADATA_TOOLS = re.compile(
+    r"\b(acrobat|distiller|pdf\w*|itext|reportlab|tcpdf|fpdf|ghostscript|wkhtmltopdf|latex|tex"
+    r"|word|excel|writer|quartz|skia|chrome|hp|canon|xerox|ricoh|epson|brother|kyocera|scan(ner|snap)?)\b",
+    re.IGNORECASE,
+)
+# Office suites, by /Creator or /Producer.
+_METADATA_OFFICE = re.compile(
+    r"\b(microsoft|word|excel|powerpoint|office|libreoffice|openoffice|staroffice|wps|google docs|pages|keynote)\b",
+    re.IGNORECASE,
+)
+# "Jane Doe", "Jane A. Doe", "Doe, Jane": an account holder, not an issuer ...
+_PERSON_NAME = re.compile(r"^([A-Z][a-z'-]+(( [A-Z]\.?)? [A-Z][a-z'-]+){1,2}|[A-Z][a-z'-]+, [A-Z][a-z'-]+)$")
+# ... unless it says it is an organisation.
+_ORGANISATION = re.compile(
+    r"\b(ltd|limited|inc|corp(oration)?|co|company|llc|llp|plc|gmbh|ag|sa|bv|nv|srl|oy|ab|group|holdings?"
+    r"|industries|bank|partners|associates|solutions|services|systems|technologies|university|council|agency)\b",
+    re.IGNORECASE,
+)
+# Document-type headings ("INVOICE", "Credit Note 1234", ...), which are often
+# set larger than the letterhead but never name the issuer.
+_DOC_TYPE_HEADING = re.compile(
+    r"^(tax |commercial |pro ?forma )?(invoice|statement|credit note|debit note|purchase order|order confirmation"
+    r"|delivery note|packing (list|slip)|quotation|quote|estimate|receipt|remittance( advice)?|reminder"
+    r"|bill|contract|agreement|certificate|payslip|report)\b",
+    re.IGNORECASE,
+)
+_XMP_NS = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+}
+
+
+def preload():
+    """
+    Import PyMuPDF and the OCR backend ahead of first use. Each OcrPool
+    worker process calls this when it starts (see OcrPool.preload).
+    """
+    import fitz  # noqa: F401  PyMuPDF
+
+    get_backend().preload()
+
+
+def safe_filename(name: str) -> str:
+    name = name.strip()
+    name = re.sub(r"[\\/:\*\?\"<>\|]", "-", name)
+    name = re.sub(r"\s+", " ", name)
+    return name
+
+
+class PdfSession:
+    """
+    One open PDF shared by text extraction and OCR.
+
+    The document is opened on first use and loaded pages are kept, so the
+    text path and the OCR fallback parse the file and its pages only once.
+    """
+
+    def __init__(self, pdf_path: str):
+        self.pdf_path = pdf_path
+        self._doc = None
+        self._pages = {}
+        self._open_error = None
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            # Don't retry a file that already failed to open (e.g. malformed).
+            if self._open_error is not None:
+                raise self._open_error
+            try:
+                import fitz  # PyMuPDF
+
+                with timed("open"):
+                    self._doc = fitz.open(self.pdf_path)
+            except Exception as e:
+                self._open_error = e
+                raise
+        return self._doc
+
+    @property
+    def page_count(self) -> int:
+        return len(self.doc)
+
+    def page(self, index: int):
+        page = self._pages.get(index)
+        if page is None:
+            doc = self.doc
+            with timed("load_page"):
+                page = self._pages[index] = doc.load_page(index)
+        return page
+
+    def close(self):
+        self._pages.clear()
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def _session(pdf_path: str, session=None):
+    """Yield `session`, or a new PdfSession for pdf_path that is closed afterwards."""
+    if session is not None:
+        yield session
+        return
+    with PdfSession(pdf_path) as own:
+        yield own
+
+
+def extract_text_from_pdf(pdf_path: str, max_pages: int = 2, session=None, cancel=None) -> str:
+    """
+    Try normal text extraction first (works for non-scanned PDFs).
+    """
+    text_chunks = []
+    try:
+        with _session(pdf_path, session) as pdf:
+            pages_to_read = min(pdf.page_count, max_pages)
+            for i in range(pages_to_read):
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                page = pdf.page(i)
+                with timed("get_text"):
+                    txt = page.get_text("text") or ""
+                if txt.strip():
+                    text_chunks.append(txt)
+    except Cancelled:
+        raise
+    except Exception:
+        return ""
+
+    return "\n".join(text_chunks).strip()
+
+
+def _iter_lines(text: str):
+    """Yield the stripped, non-empty lines of text, one at a time."""
+    start, end = 0, len(text)
+    while start < end:
+        stop = text.find("\n", start)
+        if stop < 0:
+            stop = end
+        line = text[start:stop].strip()
+        if line:
+            yield line
+        start = stop + 1
+
+
+def _is_company_like(line: str) -> bool:
+    letters = sum(ch.isalpha() for ch in line)
+    digits = sum(ch.isdigit() for ch in line)
+    return letters >= 6 and letters > digits
+
+
+def _header_band(page, fraction: float):
+    """The top `fraction` of page as a clip rectangle."""
+    import fitz  # PyMuPDF
+
+    r = page.rect
+    return fitz.Rect(r.x0, r.y0, r.x1, r.y0 + r.height * fraction)
+
+
+def _layout_lines(page, clip=None):
+    """(text, font size, bold, top y, bottom y) of each text line on page (or clip), in reading order."""
+    import fitz  # PyMuPDF
+
+    # Without image blocks: their pixel data is never needed here.
+    flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    with timed("get_text"):
+        blocks = page.get_text("dict", flags=flags, clip=clip)["blocks"]
+    lines = []
+    for block in blocks:
+        for line in block.get("lines", ()):
+            spans = [sp for sp in line["spans"] if sp["text"].strip()]
+            if not spans:
+                continue
+            text = " ".join("".join(sp["text"] for sp in spans).split())
+            size = max(sp["size"] for sp in spans)
+            bold = any(sp["flags"] & fitz.TEXT_FONT_BOLD or "Bold" in sp["font"] for sp in spans)
+            lines.append((text, size, bold, line["bbox"][1], line["bbox"][3]))
+    return lines
+
+
+def _layout_company(lines, page_height: float) -> str:
+    """
+    The line set most like a letterhead: large, bold and near the top.
+
+    Bold alone doesn't qualify a line: labels such as "Customer Details"
+    are bold at body size too. Document-type headings and single all-caps
+    words ("INVOICE", "COPY") are not ranked, however large. Returns ""
+    when no line stands out from the body text, so the caller falls back to
+    the first-line rule.
+    """
+    if not lines:
+        return ""
+    # Body size: the size most characters are set in.
+    weight = {}
+    for text, size, _, _, _ in lines:
+        weight[size] = weight.get(size, 0) + len(text)
+    body = max(weight, key=weight.get)
+
+    best, best_score = "", 0.0
+    for text, size, bold, y, _ in lines:
+        if y > page_height * LAYOUT_MAX_Y_FRACTION or len(text) < 3 or not _is_company_like(text):
+            continue
+        if _DOC_TYPE_HEADING.match(text) or (" " not in text and text.isupper()):
+            continue
+        ratio = size / body if body else 1.0
+        if ratio < LAYOUT_MIN_SIZE_RATIO:
+            continue
+        score = ratio + (0.25 if bold else 0.0) + 0.5 * (1 - y / page_height)
+        if score > best_score:
+            best, best_score = text, score
+    return best
+
+
+def _page1_texts(page, header_fraction: float, sample=None):
+    """
+    Page 1's lines in reading order, led by its layout company if any.
+
+    Only the top `header_fraction` band is extracted up front; the rest of
+    the page is read if the caller asks for more lines than the band holds.
+    Lines crossing the band's lower edge may be clipped in the band, so they
+    are left for that second pass. Every line extracted is appended to the
+    list `sample`, if given, whether or not it is consumed.
+    """
+    band = None
+    if header_fraction and header_fraction < 1:
+        band = _header_band(page, header_fraction)
+        lines = [ln for ln in _layout_lines(page, clip=band) if ln[4] <= band.y1]
+    else:
+        lines = _layout_lines(page)
+    if sample is not None:
+        sample.extend(ln[0] for ln in lines)
+
+    company = _layout_company(lines, page.rect.height)
+    if company:
+        yield company
+    for ln in lines:
+        yield ln[0]
+
+    if band is not None:
+        below = [ln[0] for ln in _layout_lines(page) if ln[4] > band.y1]
+        if sample is not None:
+            sample.extend(below)
+        yield from below
+
+
+def iter_text_lines(
+    pdf_path: str,
+    max_pages: int = 2,
+    session=None,
+    cancel=None,
+    layout: bool = True,
+    header_fraction: float = TEXT_HEADER_FRACTION,
+    sample=None,
+):
+    """
+    Yield candidate lines from the text layer, page by page.
+
+    A page is only loaded and extracted once the lines before it have been
+    consumed, so a caller that stops early (see pick_name_parts) never
+    touches the later pages. With `layout`, page 1 is read with its font
+    sizes and styles, and the line that looks most like a letterhead (see
+    _layout_company) is yielded first, ahead of the lines in reading order.
+    Page 1 is read from its top `header_fraction` band first and widened to
+    the whole page only when more lines are needed, so dense pages cost
+    little more than sparse ones. The page 1 lines extracted along the way
+    are collected in the list `sample`, if given (see text_layer_decision).
+    """
+    with _session(pdf_path, session) as pdf:
+        for i in range(min(pdf.page_count, max_pages)):
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            page = pdf.page(i)
+            if i == 0 and layout:
+                texts = _page1_texts(page, header_fraction, sample)
+            else:
+                with timed("get_text"):
+                    texts = _iter_lines(page.get_text("text") or "")
+            for line in texts:
+                if len(line) >= 3:
+                    yield line
+
+
+def _metadata_score(value: str, issuer: bool = False) -> float:
+    """How likely a metadata value is to be a real title (or issuer), 0..1."""
+    value = " ".join(value.split())
+    if not 6 <= len(value) <= 150 or _METADATA_JUNK.match(value):
+        return 0.0
+    score = 1.0
+    if " " not in value:  # user names, file stems, IDs
+        score -= 0.5
+    if sum(ch.isalpha() for ch in value) < len(value) / 2:
+        score -= 0.4
+    if _METADATA_TOOLS.search(value):
+        score -= 0.6
+    if issuer and _PERSON_NAME.match(value) and not _ORGANISATION.search(value):
+        score -= 0.5
+    return max(0.0, score)
+
+
+def _normalized(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def _xmp_values(xml: str):
+    """dc:title, dc:creator and dc:description from an XMP packet, "" where missing."""
+    values = {"title": "", "creator": "", "description": ""}
+    if not xml:
+        return values
+    try:
+        root = ET.fromstring(xml)
+    except ET.ParseError:
+        return values
+    for key in values:
+        for li in root.iterfind(f".//dc:{key}//rdf:li", _XMP_NS):
+            if li.text and li.text.strip():
+                values[key] = li.text.strip()
+                break
+    return values
+
+
+def read_metadata_name(pdf_path: str, session=None) -> str:
+    """
+    "company\ndescription" from the document info dictionary and XMP, or ""
+    if they are not good enough to name the file (see _metadata_score).
+
+    The issuer comes from /Author or dc:creator, the description from
+    /Title, dc:title, /Subject or dc:description; each is the best-scoring
+    value. Personal names score low as issuers, and everything scores
+    METADATA_OFFICE_PENALTY lower when /Creator or /Producer is an office
+    suite. /Author is often just whoever made the file, so the issuer is
+    only taken if it also appears in page 1's header band; no other page
+    is read.
+    """
+    try:
+        with _session(pdf_path, session) as pdf:
+            with timed("metadata"):
+                meta = pdf.doc.metadata or {}
+                xmp = _xmp_values(pdf.doc.get_xml_metadata())
+            office = bool(_METADATA_OFFICE.search(f"{meta.get('creator') or ''} {meta.get('producer') or ''}"))
+
+            def best(values, issuer=False):
+                penalty = METADATA_OFFICE_PENALTY if office else 0.0
+                scored = [(_metadata_score(v, issuer) - penalty, " ".join(v.split())) for v in values if v]
+                score, value = max(scored, default=(0.0, ""))
+                return value if score >= METADATA_MIN_SCORE else ""
+
+            company = best((meta.get("author", ""), xmp["creator"]), issuer=True)
+            desc = best((meta.get("title", ""), xmp["title"], meta.get("subject", ""), xmp["description"]))
+            if not (company and desc) or company == desc or not _is_company_like(company):
+                return ""
+
+            page = pdf.page(0)
+            with timed("get_text"):
+                header = page.get_text("text", clip=_header_band(page, TEXT_HEADER_FRACTION)) or ""
+    except Exception:
+        return ""
+
+    if _normalized(company) not in _normalized(header):
+        return ""
+    return f"{company}\n{desc}"
+
+
+def text_layer_stats(text: str):
+    """
+    (glyphs, share of letters, Shannon entropy in bits per glyph) of text,
+    whitespace ignored. Digits don't count against the letter share, so
+    tables of amounts and dates are not taken for junk.
+    """
+    counts = {}
+    for ch in text:
+        if not ch.isspace():
+            counts[ch] = counts.get(ch, 0) + 1
+    glyphs = sum(counts.values())
+    if not glyphs:
+        return 0, 0.0, 0.0
+    letters = sum(n for ch, n in counts.items() if ch.isalpha())
+    others = glyphs - sum(n for ch, n in counts.items() if ch.isdigit())
+    entropy = -sum(n / glyphs * math.log2(n / glyphs) for n in counts.values())
+    return glyphs, letters / others if others else 1.0, entropy
+
+
+class PageProbe:
+    """
+    What a page's image list says about it, found without rendering it.
+
+    `coverage` is the share of the page covered by images (overlaps counted
+    twice, capped at 1) and `native_dpi` the highest resolution of those
+    images. If the page is one upright image covering nearly all of it,
+    `image_xref` and `image_bbox` locate that image so OCR can decode it
+    directly (see _embedded_pixmap).
+    """
+
+    def __init__(self, coverage: float = 0.0, native_dpi: float = 0.0, image_xref: int = 0, image_bbox=None):
+        self.coverage = coverage
+        self.native_dpi = native_dpi
+        self.image_xref = image_xref
+        self.image_bbox = image_bbox
+        self.pixmap = None  # the decoded image, once _embedded_pixmap needed it
+
+    @property
+    def scanned(self) -> bool:
+        return self.coverage >= SCAN_MIN_IMAGE_COVERAGE
+
+
+def probe_page(page) -> PageProbe:
+    """Classify page from its images' placement and resolution."""
+    import fitz  # PyMuPDF
+
+    probe = PageProbe()
+    area = abs(page.rect)
+    with timed("probe"):
+        try:
+            # get_images() only reads the page's resources; the image positions
+            # need its content stream, so that is parsed only if there are images.
+            images = page.get_images() if area else []
+            if not images:
+                return probe
+            # Without xrefs=True: that hashes every image's data.
+            infos = page.get_image_info()
+        except Exception:
+            return probe
+
+        covered = 0.0
+        for info in infos:
+            bbox = fitz.Rect(info["bbox"])
+            if bbox.is_empty or bbox.width < 1 or bbox.height < 1:
+                continue
+            covered += abs(bbox & page.rect)
+            probe.native_dpi = max(probe.native_dpi, info["width"] * 72 / bbox.width, info["height"] * 72 / bbox.height)
+        probe.coverage = min(1.0, covered / area)
+
+        # One image resource drawn once: the placement is that image.
+        if len(images) == 1 and len(infos) == 1 and page.rotation == 0:
+            info = infos[0]
+            a, b, c, d, _, _ = info["transform"]
+            bbox = fitz.Rect(info["bbox"])
+            upright = a > 0 and d > 0 and b == 0 and c == 0
+            if upright and abs(bbox & page.rect) >= FULL_PAGE_IMAGE_COVERAGE * area:
+                probe.image_xref = images[0][0]
+                probe.image_bbox = bbox
+    return probe
+
+
+def text_layer_decision(text: str, page=None) -> str:
+    """
+    Decide from a sample of page 1's text layer (the lines extracted for
+    naming, or the whole page if those are too few) whether to use it
+    ("text"), OCR instead ("ocr"), or OCR too and keep the better result
+    ("both").
+
+    Junk text (few letters, or too little variety, as in a garbled OCR
+    layer) is replaced by OCR when page 1 is a scan and double-checked by
+    OCR otherwise. Sparse text (e.g. one stamp on a scan) is double-checked
+    by OCR when page 1 is a scan. The image coverage of `page` (page 1) is
+    only looked at in those two cases.
+    """
+    glyphs, alpha, entropy = text_layer_stats(text)
+    if not glyphs:
+        return "ocr"
+    # A few glyphs can't have much entropy, so only longer text is held to it.
+    junk = alpha < TEXT_MIN_ALPHA_RATIO or (glyphs >= TEXT_MIN_GLYPHS and entropy < TEXT_MIN_ENTROPY)
+    if not junk and glyphs >= TEXT_MIN_GLYPHS:
+        return "text"
+    scanned = page is not None and probe_page(page).scanned
+    if junk:
+        return "ocr" if scanned else "both"
+    return "both" if scanned else "text"
+
+
+def _name_quality(text: str):
+    """Sort key for which of two texts names a file better."""
+    parts = pick_name_parts(_candidate_lines(text))
+    glyphs, alpha, _ = text_layer_stats(text)
+    return sum(1 for part in parts if part), alpha, glyphs
+
+
+def _dpi_plan(page, clip=None, probe=None):
+    """DPIs to try for page (or clip), lowest first."""
+    area = clip if clip is not None else page.rect
+    # Never render more than OCR_MAX_PIXELS, nor above the scan's own resolution.
+    limit = math.sqrt(OCR_MAX_PIXELS / max(area.width * area.height / (72 * 72), 1e-6))
+    native = (probe or probe_page(page)).native_dpi
+    if native:
+        limit = min(limit, max(native, OCR_DPI_STEPS[0]))
+    plan = []
+    for dpi in sorted(min(dpi, limit) for dpi in OCR_DPI_STEPS):
+        # Steps that (nearly) coincide, e.g. a 150 DPI step and a 150.1 DPI
+        # scan, are one step at the higher, i.e. native, resolution.
+        if plan and dpi <= plan[-1] * (1 + DIRECT_DPI_TOLERANCE):
+            plan[-1] = dpi
+        else:
+            plan.append(dpi)
+    return plan
+
+
+def _embedded_pixmap(page, probe, clip=None):
+    """
+    The page's full-page scan image (see PageProbe), decoded as gray and
+    cut to `clip`, or None if it can't be used. Decoding the JPEG/CCITT/...
+    stream directly is far cheaper than rendering the page around it.
+    """
+    import fitz  # PyMuPDF
+
+    pix = probe.pixmap
+    if pix is None:
+        pix = fitz.Pixmap(page.parent, probe.image_xref)
+        if pix.colorspace is None:  # a stencil mask, not a picture
+            return None
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.colorspace.n != 1:
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+        # Kept for the full-page pass after the header band.
+        probe.pixmap = pix
+    if clip is not None:
+        bbox = probe.image_bbox
+        sx, sy = pix.width / bbox.width, pix.height / bbox.height
+        area = fitz.Rect(
+            (clip.x0 - bbox.x0) * sx, (clip.y0 - bbox.y0) * sy, (clip.x1 - bbox.x0) * sx, (clip.y1 - bbox.y0) * sy
+        ).irect & pix.irect
+        if area.is_empty:
+            return None
+        band = fitz.Pixmap(fitz.csGRAY, area, False)
+        band.copy(pix, area)
+        pix = band
+    return pix
+
+
+def _ocr_render(page, zoom: float, lang: str, clip=None, backend=None, cancel=None, probe=None):
+    """
+    OCR page at `zoom`; return (text, mean word confidence). When `zoom`
+    is the native resolution of the page's full-page scan image, that image
+    is decoded instead of rendering the page.
+    """
+    import fitz  # PyMuPDF
+
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+
+    pix = None
+    native = probe is not None and probe.image_xref and abs(zoom * 72 / probe.native_dpi - 1) <= DIRECT_DPI_TOLERANCE
+    if native:
+        with timed("decode_image"):
+            try:
+                pix = _embedded_pixmap(page, probe, clip)
+            except Exception:
+                pix = None
+    if pix is None:
+        mat = fitz.Matrix(zoom, zoom)
+        # Tesseract binarises internally, so a single gray channel loses nothing
+        # and is a third of the size of RGB.
+        with timed("rasterize"):
+            pix = page.get_pixmap(matrix=mat, clip=clip, colorspace=fitz.csGRAY, alpha=False)
+    with timed("tesseract"):
+        return (backend or get_backend()).recognize(pix, lang, cancel)
+
+
+def _ocr_region(page, lang: str, clip=None, zoom=None, backend=None, cancel=None, probe=None) -> str:
+    """
+    OCR page (or clip) with adaptive resolution: start at the lowest DPI
+    and escalate while the result looks unreliable. A fixed `zoom` disables
+    the adaptation. `probe` is the page's PageProbe, if already known.
+    """
+    probe = probe or probe_page(page)
+    if zoom:
+        return _ocr_render(page, zoom, lang, clip, backend, cancel, probe)[0]
+
+    best_text, best_conf = "", -1.0
+    for dpi in _dpi_plan(page, clip, probe):
+        text, conf = _ocr_render(page, dpi / 72, lang, clip, backend, cancel, probe)
+        if conf > best_conf:
+            best_text, best_conf = text, conf
+        if conf >= OCR_MIN_CONFIDENCE and len(_candidate_lines(text)) >= OCR_MIN_LINES:
+            break
+    return best_text
+
+
+def ocr_first_pages(
+    pdf_path: str,
+    max_pages: int = 1,
+    zoom: float = None,
+    lang: str = OCR_LANG,
+    session=None,
+    header_fraction: float = OCR_HEADER_FRACTION,
+    backend=None,
+    cancel=None,
+) -> str:
+    """
+    OCR fallback for scanned PDFs.
+    Render page as image using PyMuPDF, then run Tesseract OCR.
+
+    Page 1 is first OCR'd only in its top `header_fraction` band, which is
+    where the naming heuristic finds its lines; the full page is OCR'd only
+    when the band yields nothing usable. Pass header_fraction=None to always
+    OCR full pages.
+
+    The render resolution follows OCR_DPI_STEPS (see _ocr_region), capped
+    at the resolution of a scanned page's images, unless a fixed `zoom` is
+    given. A page that is a single full-page scan image has that image
+    decoded rather than re-rendered at the step matching its resolution.
+    `backend` is an OcrBackend; by default the process-wide one from
+    get_backend(). If the CancelToken `cancel` is set, Cancelled is raised
+    and a running Tesseract is stopped.
+    """
+    try:
+        with _session(pdf_path, session) as pdf:
+            pages_to_read = min(pdf.page_count, max_pages)
+            ocr_text = []
+
+            for i in range(pages_to_read):
+                page = pdf.page(i)
+                probe = probe_page(page)
+
+                txt = ""
+                if i == 0 and header_fraction and header_fraction < 1:
+                    band = _header_band(page, header_fraction)
+                    txt = _ocr_region(page, lang, clip=band, zoom=zoom, backend=backend, cancel=cancel, probe=probe)
+                    if not any(pick_name_parts(_candidate_lines(txt))):
+                        txt = ""
+                if not txt:
+                    txt = _ocr_region(page, lang, zoom=zoom, backend=backend, cancel=cancel, probe=probe)
+
+                if txt.strip():
+                    ocr_text.append(txt)
+
+        return "\n".join(ocr_text).strip()
+    except Cancelled:
+        raise
+    except Exception:
+        return ""
+
+
+def _candidate_lines(text: str):
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    return [ln for ln in lines if len(ln) >= 3]
+
+
+def pick_name_parts(lines, consumed=None):
+    """
+    Pick (company, description) from the first lines of a document.
+
+    The company is the first of the first 30 lines that is mostly letters,
+    the description the first other line of the first 60 with 6+ characters.
+    `lines` may be a lazy iterator (see iter_text_lines); it is read only
+    until both are decided. Lines read are appended to `consumed` if given.
+    """
+    company = desc = ""
+    for i, ln in enumerate(lines):
+        if consumed is not None:
+            consumed.append(ln)
+        if not company and i < 30 and _is_company_like(ln):
+            company = ln
+        # A line before the company can't equal it: it would have been picked.
+        if not desc and ln != company and len(ln) >= 6:
+            desc = ln
+        if desc and (company or i >= 29) or i >= 59:
+            break
+
+    return company, desc
+
+
+def propose_new_name(pdf_path: str, ocr=ocr_first_pages, cache=None, cancel=None, info=None) -> str:
+    """
+    Suggest rename:
+    1) Metadata, if its author appears in page 1's header (read_metadata_name)
+    2) Else the text lines, read only as far as needed (iter_text_lines)
+    3) The text-layer gate picks text, OCR of page 1 or both (text_layer_decision)
+
+    `ocr` is called as ocr(pdf_path, max_pages=1, session=..., cancel=...).
+    With a TextCache, results are looked up by file content before the PDF
+    is opened. Raises Cancelled if `cancel` is set; nothing is cached for a
+    cancelled file. A dict `info` gets "source", "cached", "ocr_pages" and
+    "decision". Proposals in one process run one at a time (_PYMUPDF_LOCK).
+    """
+    with _PYMUPDF_LOCK, timed("propose"):
+        return _propose_new_name(pdf_path, ocr, cache, cancel, info)
+
+
+def _propose_new_name(pdf_path, ocr, cache, cancel, info):
+    base = os.path.splitext(os.path.basename(pdf_path))[0]
+
+    digest = None
+    if cache is not None:
+        try:
+            with timed("hash"):
+                digest = cache.digest(pdf_path)
+        except OSError:
+            pass
+
+    computed = set()
+
+    def cached(kind, params, compute, store_empty=True):
+        def run():
+            computed.add(kind)
+            return compute()
+
+        if digest is None:
+            return run()
+        return cache.get_or_compute(digest, kind, params, run, store_empty)
+
+    sample = []  # page 1 lines extracted for naming, scored by the gate
+
+    def read_text_lines(session):
+        consumed = []
+        lines = iter_text_lines(pdf_path, max_pages=2, session=session, cancel=cancel, sample=sample)
+        try:
+            pick_name_parts(lines, consumed)
+        except Cancelled:
+            raise
+        except Exception:
+            pass  # e.g. malformed: keep what was read before the error
+        finally:
+            lines.close()
+        return "\n".join(consumed)
+
+    def decide(session, text):
+        # Scored: every page 1 line already extracted (at least the header
+        # band), not just the few naming read. Only if that is too little to
+        # judge is all of page 1 fetched; if page 1 has no text at all, the
+        # lines read (e.g. from page 2) are scored.
+        page = None
+        layer = "\n".join(sample) or text
+        if text:
+            try:
+                page = session.page(0)
+                if text_layer_stats(layer)[0] < TEXT_MIN_GLYPHS:
+                    with timed("get_text"):
+                        full = page.get_text("text") or ""
+                    if full.strip():
+                        layer = full
+            except Exception:
+                pass
+        with timed("gate"):
+            return text_layer_decision(layer, page)
+
+    decision = None
+    with PdfSession(pdf_path) as session:
+        text = cached(
+            "metadata",
+            f"min_score={METADATA_MIN_SCORE};office={METADATA_OFFICE_PENALTY};header={TEXT_HEADER_FRACTION};junk=v2",
+            lambda: read_metadata_name(pdf_path, session),
+        )
+        source = "metadata"
+        if not text:
+            # Only the lines the heuristic read are cached, hence the own key.
+            text = cached(
+                "text",
+                (
+                    f"lines;layout=v{LAYOUT_RANKING_VERSION};max_y={LAYOUT_MAX_Y_FRACTION};"
+                    f"min_size={LAYOUT_MIN_SIZE_RATIO};header={TEXT_HEADER_FRACTION};max_pages=2"
+                ),
+                lambda: read_text_lines(session),
+            )
+            source = "text"
+            decision = cached(
+                "gate",
+                (
+                    f"alpha={TEXT_MIN_ALPHA_RATIO}/nondigit;entropy={TEXT_MIN_ENTROPY};"
+                    f"glyphs={TEXT_MIN_GLYPHS};coverage={SCAN_MIN_IMAGE_COVERAGE};layer=extracted"
+                ),
+                lambda: decide(session, text),
+            )
+            METRICS.incr(f"text_layer_{decision}")
+        if decision in ("ocr", "both"):
+            ocr_text = cached(
+                "ocr",
+                (
+                    f"max_pages=1;dpi={OCR_DPI_STEPS};min_conf={OCR_MIN_CONFIDENCE};"
+                    f"lang={OCR_LANG};header={OCR_HEADER_FRACTION};engine={get_backend().name}"
+                ),
+                lambda: ocr(pdf_path, max_pages=1, session=session, cancel=cancel),
+                # An empty OCR result may just mean Tesseract failed; retry next time.
+                store_empty=False,
+            )
+            if decision == "ocr" or _name_quality(ocr_text) > _name_quality(text):
+                text, source = ocr_text, "ocr"
+
+    if info is not None:
+        info["source"] = source
+        info["cached"] = source not in computed
+        info["ocr_pages"] = 1 if "ocr" in computed else 0
+        if decision is not None:
+            info["decision"] = decision
+
+    if not text:
+        return safe_filename(base) + ".pdf"
+
+    with timed("heuristics"):
+        company, desc = pick_name_parts(_candidate_lines(text))
+
+    if not company and not desc:
+        return safe_filename(base) + ".pdf"
+
+    company = company[:60].strip()
+    desc = desc[:80].strip()
+
+    new_base = f"{company} - {desc}" if (company and desc) else (company or desc)
+    return safe_filename(new_base) + ".pdf"
+
+
+def rename_pdf(pdf_path: str, new_name: str, dry_run: bool = False):
+    """
+    Rename pdf_path to new_name in the same folder.
+
+    Returns (status, new_path), where status is "renamed", "skipped" (name
+    unchanged or target already exists) or "error". With dry_run nothing is
+    renamed and "would-rename" is returned instead of "renamed".
+    """
+    folder = os.path.dirname(pdf_path)
+    new_path = os.path.join(folder, new_name)
+
+    if os.path.abspath(pdf_path) == os.path.abspath(new_path):
+        return "skipped", new_path
+
+    if os.path.exists(new_path):
+        return "skipped", new_path
+
+    if dry_run:
+        return "would-rename", new_path
+
+    try:
+        os.rename(pdf_path, new_path)
+    except Exception:
+        return "error", new_path
+    return "renamed", new_path
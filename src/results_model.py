@@ -0,0 +1,77 @@
+"""
+Python-side store for scan results.
+
+The GUI keeps every (pdf_path, new_name) row here and materializes only the
+rows currently visible in the Treeview, so adding a row is a list append
+rather than a Tk call, and Tk memory does not grow with the number of files.
+"""
+
+
+class ResultsModel:
+    """Ordered (pdf_path, new_name) rows with O(1) lookup by path."""
+
+    def __init__(self):
+        self._paths = []
+        self._names = []
+        self._index = {}  # pdf_path -> position in _paths
+        self._removed = 0
+
+    def __len__(self):
+        self._compact()
+        return len(self._paths)
+
+    def __contains__(self, pdf_path):
+        return pdf_path in self._index
+
+    def paths(self):
+        self._compact()
+        return list(self._paths)
+
+    def row(self, i: int):
+        self._compact()
+        return self._paths[i], self._names[i]
+
+    def rows(self, start: int, stop: int):
+        self._compact()
+        return list(zip(self._paths[start:stop], self._names[start:stop]))
+
+    def set(self, pdf_path: str, new_name: str):
+        """Update the row for pdf_path, or append one."""
+        i = self._index.get(pdf_path)
+        if i is None:
+            self._index[pdf_path] = len(self._paths)
+            self._paths.append(pdf_path)
+            self._names.append(new_name)
+        else:
+            self._names[i] = new_name
+
+    def move(self, old_path: str, new_path: str, new_name: str = None):
+        """Point the row for old_path at new_path (after a rename)."""
+        i = self._index.pop(old_path)
+        self._index[new_path] = i
+        self._paths[i] = new_path
+        if new_name is not None:
+            self._names[i] = new_name
+
+    def remove(self, pdf_path: str):
+        # Tombstone now, compact once before the next read, so removing many
+        # rows in one batch stays linear.
+        i = self._index.pop(pdf_path, None)
+        if i is not None:
+            self._paths[i] = None
+            self._removed += 1
+
+    def clear(self):
+        self._paths = []
+        self._names = []
+        self._index = {}
+        self._removed = 0
+
+    def _compact(self):
+        if not self._removed:
+            return
+        keep = [i for i, p in enumerate(self._paths) if p is not None]
+        self._paths = [self._paths[i] for i in keep]
+        self._names = [self._names[i] for i in keep]
+        self._index = {p: i for i, p in enumerate(self._paths)}
+        self._removed = 0
@@ -0,0 +1,221 @@
+"""
+Background scan engine.
+
+A feeder thread pulls PDF paths from any iterable, such as the iter_pdfs
+directory walk, into an input queue. Worker threads take paths from that
+queue, run propose_new_name on each one and put (pdf_path, proposed_name)
+results on an output queue. Extraction therefore starts before discovery
+finishes. The GUI drains the output queue from the Tk event loop, so the
+window stays responsive while the scan runs.
+
+PyMuPDF is not thread-safe, so in-process proposals run one at a time;
+pass an OcrPool's propose_new_name to run them in parallel processes.
+"""
+
+import fnmatch
+import os
+import queue
+import threading
+
+from .cancellation import Cancelled, CancelToken
+from .progress import ProgressTracker
+from .renamer import propose_new_name, safe_filename
+from .text_cache import stat_key
+
+# Put on ScanJob.results once every worker has finished.
+DONE = object()
+
+_STOP = object()
+
+# How often blocked queue operations check for cancellation.
+_CANCEL_POLL_S = 0.05
+
+
+def _fallback_name(pdf_path: str) -> str:
+    base = os.path.splitext(os.path.basename(pdf_path))[0]
+    return safe_filename(base) + ".pdf"
+
+
+def _matches(name: str, rel_path: str, patterns) -> bool:
+    name = name.lower()
+    rel_path = rel_path.lower()
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel_path, p) for p in patterns)
+
+
+def iter_pdfs(root: str, include=("*.pdf",), exclude=(), max_depth=None, cancel=None):
+    """
+    Yield PDF paths under root as they are found, walking with os.scandir.
+
+    `include` and `exclude` are case-insensitive glob patterns matched against
+    the entry name and its path relative to root (with "/" separators). Files
+    must match an include pattern and no exclude pattern. Folders matching an
+    exclude pattern are not entered. `max_depth` limits how many folder levels
+    below root are walked: 0 means root only, None means no limit. Symlinked
+    folders are not followed. Each folder's entries come out sorted, but
+    nothing waits for the whole tree to be listed. The walk stops early once
+    the CancelToken `cancel` is set.
+    """
+    include = [p.lower() for p in include]
+    exclude = [p.lower() for p in exclude]
+    stack = [(root, "", 0)]
+    while stack:
+        if cancel is not None and cancel.cancelled:
+            return
+        folder, rel, depth = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subfolders = []
+        for entry in entries:
+            entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if (max_depth is None or depth < max_depth) and not _matches(entry.name, entry_rel, exclude):
+                    subfolders.append((entry.path, entry_rel, depth + 1))
+            elif _matches(entry.name, entry_rel, include) and not _matches(entry.name, entry_rel, exclude):
+                yield entry.path
+
+        # Reversed so the stack pops them in sorted order.
+        stack.extend(reversed(subfolders))
+
+
+class ScanJob:
+    """
+    Propose new names for PDFs on worker threads.
+
+    ``pdf_paths`` can be any iterable, including a generator such as
+    iter_pdfs. It is consumed on a feeder thread while the workers run.
+    ``discovered`` counts the paths handed out so far, and ``discovery_done``
+    is set once the iterable is exhausted.
+
+    Results arrive on ``results`` in completion order. ``DONE`` is put on the
+    queue after the last result. A file that no longer exists is reported as
+    (pdf_path, None).
+
+    ``propose`` proposes one name, with the signature of
+    renamer.propose_new_name. Pass OcrPool.propose_new_name to run
+    proposals in worker processes; in-process ones don't overlap. ``cache``
+    is an optional TextCache. ``known`` maps paths to the stat_key seen by an earlier scan; files whose stat_key
+    still matches are skipped without a result. The stat_key of every file
+    that was checked is recorded in ``stats``.
+
+    ``progress`` is a ProgressTracker. Each checked file is recorded there
+    by how it was handled ("text", "ocr", "cached", "unchanged", "missing"
+    or "error"). Its total is set once discovery is done.
+
+    cancel() stops discovery, extraction and OCR at their next check and
+    drops any results still being produced. Pass the ``cancel`` token to
+    iter_pdfs too, so a long walk stops as well.
+    """
+
+    def __init__(
+        self,
+        pdf_paths,
+        workers=None,
+        cache=None,
+        known=None,
+        cancel=None,
+        propose=propose_new_name,
+    ):
+        self.pdf_paths = pdf_paths
+        self.propose = propose
+        self.cache = cache
+        self.known = known or {}
+        self.stats = {}
+        self.cancel_token = cancel or CancelToken()
+        self.progress = ProgressTracker()
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.results = queue.Queue()
+        self.discovered = 0
+        self.discovery_done = False
+
+        # Bounded, so discovery doesn't run arbitrarily far ahead of the workers.
+        self._inbox = queue.Queue(maxsize=self.workers * 4)
+        self._threads = []
+        self._remaining = self.workers
+        self._lock = threading.Lock()
+
+    def start(self):
+        targets = [self._feed] + [self._worker] * self.workers
+        for target in targets:
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token.cancelled
+
+    def _put(self, item) -> bool:
+        """Put item on the inbox unless the job is cancelled while waiting."""
+        while not self.cancelled:
+            try:
+                self._inbox.put(item, timeout=_CANCEL_POLL_S)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self):
+        try:
+            for pdf_path in self.pdf_paths:
+                if not self._put(pdf_path):
+                    return
+                self.discovered += 1
+        finally:
+            self.progress.total = self.discovered
+            self.discovery_done = True
+            for _ in range(self.workers):
+                if not self._put(_STOP):
+                    break
+
+    def _worker(self):
+        while True:
+            try:
+                pdf_path = self._inbox.get(timeout=_CANCEL_POLL_S)
+            except queue.Empty:
+                if self.cancelled:
+                    break
+                continue
+            if pdf_path is _STOP or self.cancelled:
+                break
+
+            try:
+                key = stat_key(os.stat(pdf_path))
+            except OSError:
+                self.progress.record("missing")
+                self.results.put((pdf_path, None))
+                continue
+            self.stats[pdf_path] = key
+            if self.known.get(pdf_path) == key:
+                self.progress.record("unchanged")
+                continue
+
+            info = {}
+            try:
+                new_name = self.propose(pdf_path, cache=self.cache, cancel=self.cancel_token, info=info)
+            except Cancelled:
+                break
+            except Exception:
+                new_name = _fallback_name(pdf_path)
+            if self.cancelled:
+                break
+            source = "error" if not info else ("cached" if info["cached"] else info["source"])
+            self.progress.record(source, ocr_pages=info.get("ocr_pages", 0))
+            self.results.put((pdf_path, new_name))
+
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last:
+            self.results.put(DONE)
@@ -0,0 +1,120 @@
+"""
+Persistent, content-addressed cache of extracted and OCR'd text.
+
+Entries are keyed by the SHA-256 of the file content plus the kind of
+extraction ("text" or "ocr") and its parameters, so a file that was seen
+before comes back without opening the PDF again, across sessions and
+regardless of its current name.
+
+Hashing a large PDF on a network share is itself costly, so a stat index maps
+(device, inode, size, mtime_ns) to the content hash and the file is only
+re-hashed when that tuple changes. A rename keeps the inode and mtime, so a
+renamed file still hits the cache without being read.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "PDF_RENAMER_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "pdf-renamer-gui", "text_cache.sqlite3"),
+)
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stat_key(st: os.stat_result):
+    """The (device, inode, size, mtime_ns) tuple the stat index is keyed on."""
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class TextCache:
+    """SQLite-backed text cache. Safe to share between scan threads."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS texts ("
+                " digest TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " params TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " PRIMARY KEY (digest, kind, params))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stat_index ("
+                " dev INTEGER NOT NULL,"
+                " ino INTEGER NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " digest TEXT NOT NULL,"
+                " PRIMARY KEY (dev, ino))"
+            )
+
+    def digest(self, path: str) -> str:
+        """Content hash of path, hashing the file only if its stat tuple changed."""
+        dev, ino, size, mtime_ns = stat_key(os.stat(path))
+        # Some filesystems (e.g. certain SMB mounts) report no inode numbers.
+        if not ino:
+            return file_digest(path)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, digest FROM stat_index WHERE dev = ? AND ino = ?",
+                (dev, ino),
+            ).fetchone()
+        if row and row[0] == size and row[1] == mtime_ns:
+            return row[2]
+
+        digest = file_digest(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stat_index (dev, ino, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)",
+                (dev, ino, size, mtime_ns, digest),
+            )
+        return digest
+
+    def get(self, digest: str, kind: str, params: str):
+        """Return the cached text, or None when there is no entry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM texts WHERE digest = ? AND kind = ? AND params = ?",
+                (digest, kind, params),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, digest: str, kind: str, params: str, text: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO texts (digest, kind, params, text) VALUES (?, ?, ?, ?)",
+                (digest, kind, params, text),
+            )
+
+    def get_or_compute(self, digest: str, kind: str, params: str, compute, store_empty: bool = True) -> str:
+        text = self.get(digest, kind, params)
+        if text is None:
+            text = compute()
+            if text or store_empty:
+                self.put(digest, kind, params, text)
+        return text
+
+    def close(self):
+        with self._lock:
+            self._conn.close()